@@ -1,21 +1,27 @@
+import itertools
 from utils.autostart import enable_autostart
 from utils.first_launch import is_first_launch, mark_first_launch_done
 import tkinter as tk
 from tkinter import ttk, messagebox
-from pytubefix import YouTube
 from download_window import DownloadWindow
+from playlist_window import PlaylistWindow
+from playlist_batch import collection_kind
 from library_window import LibraryWindow
 from utils.library_manager import get_library_count
 from utils.window_pos_helper import center_window
+from utils.ui_bus import ui_bus
+from utils.local_api import LocalAPI
+from utils.urls import normalize_youtube_url, is_youtube_url
 from tray import SystemTray
 
-from utils.files import confirm_existing_file
-from utils.save_settings import get_default_download_path
-from utils.files import safe_filename
-
 
 CLIPBOARD_TRIGGER = "start_download"
 
+# clipboard handoff is only a fallback for older extensions once the
+# local endpoint runs, so it is checked far less often then
+CLIPBOARD_POLL_INTERVAL = 800
+CLIPBOARD_FALLBACK_INTERVAL = 3000
+
 
 class Pica:
     def __init__(self, root):
@@ -24,6 +30,7 @@ class Pica:
             mark_first_launch_done()
 
         self.root = root
+        ui_bus.attach(self.root)
         self.root.title("Pica – YouTube Video Downloader")
         icon = tk.PhotoImage(file="icon.png")
         root.iconphoto(True, icon)
@@ -37,6 +44,13 @@ class Pica:
 
 
         self.last_clip = ""
+        self.launch_seq = itertools.count()
+
+        self.api = LocalAPI(self.handle_api_download)
+        self.clipboard_interval = (
+            CLIPBOARD_FALLBACK_INTERVAL if self.api.start()
+            else CLIPBOARD_POLL_INTERVAL
+        )
 
         self.build_ui()
         self.poll_clipboard()
@@ -57,7 +71,6 @@ class Pica:
             text="YouTube Video URL:"
         ).pack(side="left")
 
-        get_library_count()
         self.library_link = ttk.Label(
             top_row,
             text=f"Library ({get_library_count()})",
@@ -87,18 +100,7 @@ class Pica:
     # -------------------------------
 
     def normalize_youtube_url(self, url):
-        try:
-            if "/shorts/" in url:
-                video_id = url.split("/shorts/")[1].split("?")[0]
-                return f"https://www.youtube.com/watch?v={video_id}"
-
-            if "youtu.be/" in url:
-                video_id = url.split("youtu.be/")[1].split("?")[0]
-                return f"https://www.youtube.com/watch?v={video_id}"
-
-            return url
-        except Exception:
-            return url
+        return normalize_youtube_url(url)
 
 
     # -------------------------------
@@ -117,27 +119,10 @@ class Pica:
             messagebox.showerror("Error", "Invalid YouTube URL")
             return
 
-        try:
-            yt = YouTube(url)
-        except Exception as e:
-            messagebox.showerror("Error", str(e))
-            return
-
-        # predict filename (initial assumption)
-        folder = get_default_download_path()
-        filename = safe_filename(yt.title) + ".mp4"
-
         self.url_entry.delete(0, tk.END)
 
-        # Open download window
-        dw = DownloadWindow(self.root, yt)
-
-        if not confirm_existing_file(folder, filename, parent=dw.win):
-            dw.win.destroy()     # close download window
-            self.root.withdraw() # hide main window
-            return
-
-        self.root.withdraw()
+        # Open download window, it resolves the video in the background
+        self.open_download(url)
 
     # -------------------------------
     # Clipboard watcher
@@ -159,38 +144,79 @@ class Pica:
             if self.is_youtube_url(url):
                 self.handle_clipboard_download(url)
 
-        self.root.after(800, self.poll_clipboard)
+        self.root.after(self.clipboard_interval, self.poll_clipboard)
 
     def handle_clipboard_download(self, url):
-        try:
-            yt = YouTube(url)
-        except Exception:
-            return
-
         # Clear clipboard so it triggers only once
         self.root.clipboard_clear()
 
-        folder = get_default_download_path()
-        filename = safe_filename(yt.title) + ".mp4"
+        # Open download window, it resolves the video in the background
+        self.open_download(url)
 
-        # Open download window
-        dw = DownloadWindow(self.root, yt)
+    # -------------------------------
+    # Browser extension (local endpoint)
+    # -------------------------------
+    def handle_api_download(self, url, quality=None):
+        # server thread: validate here, open the window on the Tk thread
+        url = self.normalize_youtube_url(url)
+        if not self.is_youtube_url(url):
+            return False
 
-        if not confirm_existing_file(folder, filename, parent=dw.win):
-            dw.win.destroy()     # close download window
-            self.root.withdraw() # hide main window
-            return
+        ui_bus.post(("api", url), self.open_download, url, quality)
+        return True
 
+    def open_download(self, url, quality=None):
+        if collection_kind(url):
+            PlaylistWindow(self.root, url, preset=quality)
+        else:
+            DownloadWindow(self.root, url, preset=quality)
         self.root.withdraw()
 
+    # -------------------------------
+    # Launch arguments (also forwarded by later launches)
+    # -------------------------------
+    def forward_launch(self, args):
+        # listener thread, every launch is handled on its own
+        ui_bus.post(("launch", next(self.launch_seq)), self.handle_launch, args)
+
+    def handle_launch(self, args):
+        """
+        Arguments: YouTube URLs, --quality=<preset> for those URLs,
+        --show and --library. No arguments shows the main window.
+        """
+        quality = None
+        urls = []
+        show = not args
+        library = False
+
+        for arg in args:
+            if arg.startswith("--quality="):
+                quality = arg.split("=", 1)[1] or None
+            elif arg == "--show":
+                show = True
+            elif arg == "--library":
+                library = True
+            else:
+                url = self.normalize_youtube_url(arg.strip())
+                if self.is_youtube_url(url):
+                    urls.append(url)
+
+        for url in urls:
+            self.open_download(url, quality)
+
+        if library:
+            self.open_library()
+
+        if show:
+            self.root.deiconify()
+            self.root.lift()
+            self.root.focus_force()
+
     # -------------------------------
     # URL validation
     # -------------------------------
     def is_youtube_url(self, url):
-        return (
-            url.startswith("https://www.youtube.com/")
-            or url.startswith("https://youtu.be/")
-        )
+        return is_youtube_url(url)
 
 
     # -------------------------------
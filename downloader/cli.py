@@ -0,0 +1,336 @@
+"""
+Headless Pica, no Tk, PIL or pystray.
+
+    python -m downloader.cli URL [URL ...] [-i urls.txt] [-q 720p] [-j 3] [-o DIR]
+                             [--job-limit 2M]
+
+Prints one JSON object per line on stdout: queued, progress,
+completed, failed, skipped, batch, periodic queue telemetry while
+downloads run and a final summary with the connection pool
+statistics.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+# the app imports its modules flat, from the downloader folder
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.http_pool import pool_stats
+from utils.library_manager import find_downloaded
+from utils.resolver import resolver
+from utils.save_settings import get_default_download_path
+from utils.stream_selection import QUALITY_PRESETS, pick_quality
+from utils.urls import normalize_youtube_url, is_youtube_url, video_id_from_url
+from download_job import DownloadJob, MERGING, COMPLETED, FAILED, CANCELLED
+from download_queue import download_queue, MAX_ACTIVE_DOWNLOADS
+from playlist_batch import PlaylistBatch, collection_kind
+
+
+# ----------------------------
+# Config
+# ----------------------------
+
+# progress lines per job are printed at most this often
+PROGRESS_INTERVAL = 1.0
+
+# how often the main thread checks whether everything finished
+WAIT_INTERVAL = 0.2
+
+# queue telemetry (total rate, stalled jobs) is printed this often
+STATS_INTERVAL = 5.0
+
+
+class Reporter:
+    """
+    Prints JSON lines for jobs and batches, from any thread.
+    """
+
+    def __init__(self, out=sys.stdout):
+        self.out = out
+        self.lock = threading.Lock()
+        self.last_progress = {}   # job -> time of last progress line
+        self.last_state = {}      # job / batch -> last reported state
+        self.failed = 0
+        self.completed = 0
+        self.skipped = 0
+
+    def emit(self, event, **fields):
+        line = json.dumps({"event": event, "time": round(time.time(), 3), **fields})
+        with self.lock:
+            self.out.write(line + "\n")
+            self.out.flush()
+
+    def count(self, name):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def job_fields(self, job):
+        return {
+            "video_id": job.yt.video_id,
+            "title": job.yt.title,
+            "itag": job.stream.itag,
+        }
+
+    def watch(self, job):
+        self.emit("queued", **self.job_fields(job))
+        job.subscribe(self.on_job)
+
+    def on_job(self, job):
+        now = time.time()
+        state = job.state
+
+        with self.lock:
+            changed = self.last_state.get(job) != state
+            self.last_state[job] = state
+            due = now - self.last_progress.get(job, 0) >= PROGRESS_INTERVAL
+            if changed or due:
+                self.last_progress[job] = now
+
+        if state == COMPLETED and changed:
+            self.count("completed")
+            self.emit("completed", path=job.final_file_path, **self.job_fields(job))
+        elif state == FAILED and changed:
+            self.count("failed")
+            self.emit("failed", **self.job_fields(job))
+        elif state == CANCELLED:
+            return
+        elif changed or due:
+            self.emit(
+                "progress",
+                state=state,
+                percent=job.merge_percent if state == MERGING else job.percent,
+                downloaded=job.downloaded,
+                total=job.total_size,
+                speed=round(job.speed),
+                eta=round(job.remaining) if job.remaining_mode == "active" else None,
+                stalled=job.remaining_mode == "stalled",
+                **self.job_fields(job)
+            )
+
+    def on_batch(self, batch):
+        counts = {
+            "found": batch.found,
+            "skipped": batch.skipped,
+            "queued": batch.queued,
+            "failed": batch.failed,
+            "expanding": batch.expanding,
+        }
+
+        # batches also notify on every job update, print changes only
+        with self.lock:
+            if self.last_state.get(batch) == counts:
+                return
+            self.last_state[batch] = counts
+
+        self.emit("batch", url=batch.url, **counts)
+
+
+# ----------------------------
+# Input
+# ----------------------------
+
+RATE_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+
+def parse_rate(value):
+    """
+    Bytes per second from "500K", "2M" or a plain number, 0 is unlimited.
+    """
+    text = value.strip().upper().removesuffix("B")
+    unit = text[-1:] if text[-1:] in RATE_UNITS else ""
+    try:
+        number = float(text[:len(text) - len(unit)])
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid rate: {value!r}")
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"invalid rate: {value!r}")
+    return int(number * RATE_UNITS[unit])
+
+
+def read_urls(args):
+    urls = list(args.urls)
+
+    if args.input:
+        f = sys.stdin if args.input == "-" else open(args.input, "r", encoding="utf-8")
+        with f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    urls.append(line)
+
+    result = []
+    for url in urls:
+        url = normalize_youtube_url(url.strip())
+        if is_youtube_url(url) and url not in result:
+            result.append(url)
+    return result
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog="python -m downloader.cli",
+        description="Download YouTube videos, playlists and channels without a UI."
+    )
+    parser.add_argument("urls", nargs="*", help="video, playlist or channel urls")
+    parser.add_argument("-i", "--input", help="file with one url per line, - for stdin")
+    parser.add_argument(
+        "-q", "--quality",
+        default="best",
+        choices=QUALITY_PRESETS,
+        help=f"quality preset: {', '.join(QUALITY_PRESETS)}"
+    )
+    parser.add_argument(
+        "-j", "--concurrency",
+        type=int,
+        default=MAX_ACTIVE_DOWNLOADS,
+        help="downloads running at the same time"
+    )
+    parser.add_argument("-o", "--output", help="download folder (default: last used)")
+    parser.add_argument(
+        "--job-limit",
+        type=parse_rate,
+        default=0,
+        metavar="RATE",
+        help="speed cap per download, e.g. 500K or 2M (bytes/s), on top of the global limit"
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="download videos that are already in the library again"
+    )
+    return parser.parse_args(argv)
+
+
+# ----------------------------
+# Run
+# ----------------------------
+
+def queue_video(url, folder, preset, speed_limit, reporter, jobs):
+    try:
+        resolved = resolver.resolve(url).result()
+    except Exception as e:
+        reporter.count("failed")
+        reporter.emit("failed", url=url, error=str(e))
+        return
+
+    choice = pick_quality(resolved.options, preset)
+    if not choice:
+        reporter.count("failed")
+        reporter.emit("failed", url=url, error="no stream matches the quality preset")
+        return
+
+    job = DownloadJob(
+        resolved.yt,
+        choice[1],
+        folder,
+        speed_limit=speed_limit,
+        audio=resolved.audio
+    )
+    reporter.watch(job)
+    jobs.append(job)
+    download_queue.submit(job)
+
+
+def run(argv=None):
+    args = parse_args(argv)
+    urls = read_urls(args)
+    if not urls:
+        print("No YouTube urls given", file=sys.stderr)
+        return 2
+
+    folder = args.output or get_default_download_path()
+    os.makedirs(folder, exist_ok=True)
+
+    download_queue.set_max_active(args.concurrency)
+    reporter = Reporter()
+
+    jobs = []
+    batches = []
+    resolving = []
+
+    for url in urls:
+        if collection_kind(url):
+            batch = PlaylistBatch(
+                url,
+                folder,
+                preset=args.quality,
+                speed_limit=args.job_limit,
+                on_job=reporter.watch
+            )
+            batch.subscribe(reporter.on_batch)
+            batches.append(batch)
+            batch.start()
+            continue
+
+        # videos we already have are skipped without a network call
+        existing = None if args.force else find_downloaded(video_id_from_url(url))
+        if existing:
+            reporter.count("skipped")
+            reporter.emit(
+                "skipped",
+                url=url,
+                video_id=existing["id"],
+                path=existing["path"],
+                reason="in library"
+            )
+            continue
+
+        # resolve on a thread so later urls don't wait for this one
+        thread = threading.Thread(
+            target=queue_video,
+            args=(url, folder, args.quality, args.job_limit, reporter, jobs),
+            daemon=True
+        )
+        thread.start()
+        resolving.append(thread)
+
+    last_stats = time.monotonic()
+    try:
+        while True:
+            now = time.monotonic()
+            if now - last_stats >= STATS_INTERVAL:
+                last_stats = now
+                stats = download_queue.stats()
+                if stats["active"]:
+                    reporter.emit(
+                        "queue",
+                        active=stats["active"],
+                        waiting=stats["waiting"],
+                        rate=round(stats["rate"]),
+                        stalled=stats["stalled"],
+                    )
+
+            all_jobs = jobs + [job for batch in batches for job in batch.jobs]
+            if (
+                not any(t.is_alive() for t in resolving)
+                and not any(batch.expanding for batch in batches)
+                and all(job.is_finished for job in all_jobs)
+            ):
+                break
+            time.sleep(WAIT_INTERVAL)
+    except KeyboardInterrupt:
+        # paused jobs keep their .part files, the next run resumes them
+        for job in jobs + [job for batch in batches for job in batch.jobs]:
+            download_queue.pause(job)
+        reporter.emit("interrupted")
+        return 130
+
+    skipped = reporter.skipped + sum(batch.skipped for batch in batches)
+    failed = reporter.failed + sum(batch.failed for batch in batches)
+
+    reporter.emit(
+        "summary",
+        completed=reporter.completed,
+        failed=failed,
+        skipped=skipped,
+        pool=pool_stats(),
+    )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run())
@@ -0,0 +1,433 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
+from tools.ffmpeg_helper import merge_audio_video, StreamingMerge
+
+from utils.files import safe_filename, get_unique_path
+from utils.library_manager import add_to_library
+from utils.segmented_download import download_stream, resolve_stream_url, replace_file
+from utils.rate_limiter import TokenBucket
+from utils.stream_selection import best_audio_stream
+from utils.telemetry import TransferTelemetry
+
+
+# ----------------------------
+# Job states
+# ----------------------------
+
+QUEUED = "queued"
+CONNECTING = "connecting"
+DOWNLOADING = "downloading"
+MERGING = "merging"
+PAUSED = "paused"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_STATES = (COMPLETED, FAILED, CANCELLED)
+
+# mux with ffmpeg while the tracks are still downloading
+STREAMING_MERGE = True
+
+# priorities, lower runs first
+HIGH = 0
+NORMAL = 1
+LOW = 2
+
+# picking a free final name and renaming onto it is one step
+_final_name_lock = threading.Lock()
+
+
+class DownloadJob:
+    """
+    One download (video, chosen stream, destination folder).
+    Runs on a DownloadQueue worker thread, never touches Tk.
+    Listeners are called with the job on every state or progress
+    change, from whatever thread made it, and read its fields.
+
+    audio is the track merged into adaptive video streams, looked up
+    from yt when not given. speed_limit (bytes/s) caps this job on top
+    of the global limit.
+    """
+
+    def __init__(self, yt, stream, folder, priority=NORMAL, speed_limit=0,
+                 audio=None):
+        self.yt = yt
+        self.stream = stream
+        self.audio = audio
+        self.folder = folder
+        self.priority = priority
+        self.limiter = TokenBucket(speed_limit) if speed_limit else None
+
+        self.is_progressive = stream.is_progressive
+        self.is_audio_only = stream.type == "audio"
+
+        self.listeners = []
+        self._state = QUEUED
+        self.label = "Queued"
+        self.final_file_path = None
+        self.merge_output = None    # ffmpeg output of this attempt
+        self.cancel_event = threading.Event()
+        self.resume_requested = False   # resumed while still stopping
+
+        # combined progress over every stream being transferred
+        self.transfer = {
+            "done": {},      # stream -> bytes downloaded
+            "sizes": {},     # stream -> total bytes
+        }
+        self.transfer_lock = threading.Lock()
+
+        self.total_size = stream.filesize_approx
+        self.downloaded = 0
+        self.telemetry = TransferTelemetry()   # bytes fetched in this attempt
+
+        self.merge_percent = 0
+        self.merge_speed = 0.0      # x realtime, from ffmpeg
+        self.merge_eta = None
+
+        self.start_time = None
+        self.elapsed_before = 0.0   # time spent in earlier attempts
+
+    # ----------------------------
+    # Read side (used by windows)
+    # ----------------------------
+
+    @property
+    def state(self):
+        return self._state
+
+    @state.setter
+    def state(self, state):
+        self._state = state
+        self.notify()
+
+    @property
+    def percent(self):
+        if not self.total_size:
+            return 0
+        return int(self.downloaded / self.total_size * 100)
+
+    @property
+    def is_finished(self):
+        return self.state in FINISHED_STATES
+
+    @property
+    def speed(self):
+        return self.telemetry.rate()
+
+    @property
+    def remaining(self):
+        if self.state == MERGING:
+            return self.merge_eta or 0
+        return self.telemetry.eta(self.total_size - self.downloaded) or 0
+
+    @property
+    def remaining_mode(self):
+        """
+        One of "na", "calculating", "stalled", "active", "done".
+        """
+        if self.state == COMPLETED:
+            return "done"
+        if self.state == CONNECTING:
+            return "calculating"
+        if self.state == MERGING:
+            return "calculating" if self.merge_eta is None else "active"
+        if self.state == DOWNLOADING:
+            if self.telemetry.stalled():
+                return "stalled"
+            if self.telemetry.eta(self.total_size - self.downloaded) is None:
+                return "calculating"
+            return "active"
+        return "na"
+
+    def elapsed(self):
+        if self.start_time is None:
+            return self.elapsed_before
+        return self.elapsed_before + time.time() - self.start_time
+
+    # ----------------------------
+    # Listeners
+    # ----------------------------
+
+    def subscribe(self, listener):
+        if listener not in self.listeners:
+            self.listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    def notify(self):
+        for listener in list(self.listeners):
+            try:
+                listener(self)
+            except Exception:
+                pass
+
+    # ----------------------------
+    # Control (used by DownloadQueue)
+    # ----------------------------
+
+    def pause(self):
+        # a running merge can't be stopped and picked up again,
+        # it is left to finish
+        if self.is_finished or self.state == MERGING:
+            return
+        self.state = PAUSED
+        self.cancel_event.set()
+
+    def set_speed_limit(self, speed_limit):
+        if self.limiter:
+            self.limiter.set_rate(speed_limit)
+        elif speed_limit:
+            # picked up by the next attempt
+            self.limiter = TokenBucket(speed_limit)
+
+    def cancel(self):
+        if self.state == COMPLETED:
+            return
+        self.state = CANCELLED
+        self.cancel_event.set()
+
+    # ----------------------------
+    # Transfer
+    # ----------------------------
+
+    def run(self):
+        if self.cancel_event.is_set():
+            return
+
+        self.state = CONNECTING
+        self.start_time = time.time()
+
+        try:
+            if self.is_audio_only or self.is_progressive:
+                ext = ".m4a" if self.is_audio_only else ".mp4"
+                path = self.track_path(self.stream, ext)
+
+                self.start_transfer([self.stream], "Downloading")
+                self.fetch_stream(self.stream, path)
+            else:
+                path = self.download_adaptive()
+
+            if self.cancel_event.is_set():
+                raise InterruptedError()
+
+            self.final_file_path = self.move_to_final_name(path)
+
+            self.telemetry.end_phase()
+
+            # Add to Library
+            try:
+                add_to_library(self.yt, self.final_file_path)
+            except Exception:
+                pass
+
+            self.state = COMPLETED
+        except Exception:
+            if self.state == CANCELLED:
+                self.remove_partial_output()
+            elif self.state != PAUSED:
+                self.state = FAILED
+            self.telemetry.end_phase()
+        finally:
+            self.elapsed_before = self.elapsed()
+            self.start_time = None
+
+    def remove_partial_output(self):
+        # track .part files are kept so the video can be resumed later
+        try:
+            if self.merge_output and os.path.exists(self.merge_output):
+                os.remove(self.merge_output)
+        except Exception:
+            pass
+
+    def track_path(self, stream, ext):
+        # named per video/itag, never by title, so retries resume them
+        # and two jobs with the same title never share a .part file
+        return os.path.join(self.folder, f"{self.yt.video_id}.f{stream.itag}{ext}")
+
+    def move_to_final_name(self, path):
+        """
+        Renames a finished download to a free name from its title.
+        """
+        filename = safe_filename(self.yt.title) + os.path.splitext(path)[1]
+        with _final_name_lock:
+            final_path = get_unique_path(self.folder, filename)
+            replace_file(path, final_path)
+        return final_path
+
+    def fetch_stream(self, stream, path, on_contiguous=None):
+        # partial bytes stay in path + ".part", so a retry resumes
+        return download_stream(
+            stream,
+            path,
+            on_progress=self.on_progress,
+            cancel_event=self.cancel_event,
+            video_id=self.yt.video_id,
+            resolve_url=lambda: resolve_stream_url(self.yt.watch_url, stream.itag),
+            limiter=self.limiter,
+            on_contiguous=on_contiguous
+        )
+
+    def download_adaptive(self):
+        """
+        Downloads both tracks and merges them. Returns the merged
+        file, renamed to its final name by run().
+        """
+        # resolve audio up front so both tracks download together
+        audio = self.audio or best_audio_stream(self.yt)
+
+        self.start_transfer([self.stream, audio], "Downloading Video & Audio")
+
+        video_path = self.track_path(self.stream, ".mp4")
+        audio_path = self.track_path(audio, ".m4a")
+
+        output = os.path.join(
+            self.folder,
+            f"{self.yt.video_id}.f{self.stream.itag}+{audio.itag}.mp4"
+        )
+        self.merge_output = output
+
+        self.merge_percent = 0
+        self.merge_speed = 0.0
+        self.merge_eta = None
+
+        merge = self.start_streaming_merge(
+            [(video_path, self.stream), (audio_path, audio)],
+            output
+        )
+
+        try:
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                video_job = pool.submit(
+                    self.fetch_stream,
+                    self.stream,
+                    video_path,
+                    merge.feeder(0).update if merge else None
+                )
+                audio_job = pool.submit(
+                    self.fetch_stream,
+                    audio,
+                    audio_path,
+                    merge.feeder(1).update if merge else None
+                )
+
+                # if one track fails, stop the other one too
+                done, _ = wait([video_job, audio_job], return_when=FIRST_EXCEPTION)
+                if any(job.exception() for job in done):
+                    self.cancel_event.set()
+
+                video_job.result()
+                audio_job.result()
+        except Exception:
+            if merge:
+                merge.abort()
+            raise
+
+        self.state = MERGING
+        self.telemetry.start_phase("merge")
+
+        merged = False
+        if merge:
+            try:
+                merge.finish()
+                merged = True
+            except Exception:
+                pass   # tracks are complete on disk, merge them normally
+
+        if not merged:
+            merge_audio_video(
+                video_path,
+                audio_path,
+                output,
+                duration=self.yt.length,
+                on_progress=self.on_merge_progress
+            )
+
+        if self.cancel_event.is_set():
+            return None
+
+        try:
+            os.remove(video_path)
+            os.remove(audio_path)
+        except Exception:
+            pass
+
+        return output
+
+    def start_streaming_merge(self, tracks, output):
+        """
+        Starts ffmpeg on the growing track files, None if it can't be
+        used (unknown track sizes, ffmpeg failed to start).
+        """
+        if not STREAMING_MERGE:
+            return None
+
+        try:
+            sizes = [stream.filesize for _, stream in tracks]
+            if not all(sizes):
+                return None
+
+            merge = StreamingMerge(
+                [(path, size) for (path, _), size in zip(tracks, sizes)],
+                output,
+                duration=self.yt.length,
+                on_progress=self.on_merge_progress
+            )
+            merge.start()
+            return merge
+        except Exception:
+            return None
+
+    def start_transfer(self, streams, label):
+        sizes = {
+            stream: stream.filesize or stream.filesize_approx
+            for stream in streams
+        }
+
+        with self.transfer_lock:
+            self.transfer["sizes"] = sizes
+            self.transfer["done"] = {stream: 0 for stream in streams}
+
+        self.label = label
+        self.total_size = sum(sizes.values())
+        self.downloaded = 0
+        self.telemetry.reset()
+        self.telemetry.start_phase("download")
+
+    # -------------------------------
+    # download callback (NO UI here)
+    # -------------------------------
+    def on_progress(self, stream, chunk, bytes_remaining):
+        if self.cancel_event.is_set():
+            return
+
+        with self.transfer_lock:
+            if stream not in self.transfer["done"]:
+                return
+
+            self.transfer["done"][stream] = (
+                self.transfer["sizes"][stream] - bytes_remaining
+            )
+            self.downloaded = sum(self.transfer["done"].values())
+
+        # resumed bytes arrive as an empty chunk, they are not
+        # part of this attempt's speed
+        self.telemetry.add(len(chunk))
+
+        if self.state == CONNECTING and chunk:
+            self.state = DOWNLOADING
+        else:
+            self.notify()
+
+    def on_merge_progress(self, percent, speed, eta):
+        # while the streaming mux waits on downloads these are only
+        # stored, the window shows them once the job is merging
+        self.merge_percent = percent
+        self.merge_speed = speed
+        self.merge_eta = eta
+
+        if self.state == MERGING:
+            self.notify()
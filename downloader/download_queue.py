@@ -0,0 +1,194 @@
+import heapq
+import itertools
+import threading
+import time
+
+from download_job import QUEUED, PAUSED, FAILED
+
+
+# ----------------------------
+# Config
+# ----------------------------
+
+MAX_ACTIVE_DOWNLOADS = 3
+
+# running jobs notify listeners at least this often, so elapsed
+# time and stall state move on while no bytes arrive
+HEARTBEAT_INTERVAL = 1.0
+
+
+class DownloadQueue:
+    """
+    Process-wide scheduler for DownloadJobs.
+    Runs at most max_active jobs at once, lower priority value first,
+    in submit order within the same priority.
+    """
+
+    def __init__(self, max_active=MAX_ACTIVE_DOWNLOADS):
+        self.max_active = max_active
+        self.lock = threading.Lock()
+        self.waiting = []        # heap of (priority, seq, job)
+        self.active = set()
+        self.seq = itertools.count()
+        self.heartbeat = None
+
+    # ----------------------------
+    # Public API
+    # ----------------------------
+
+    def submit(self, job):
+        with self.lock:
+            if job in self.active:
+                # the previous attempt is still unwinding (a read can
+                # block until its timeout), run_job resubmits once it
+                # returns so two attempts never share the .part files
+                job.resume_requested = True
+                return job
+
+            job.resume_requested = False
+            job.state = QUEUED
+            job.cancel_event = threading.Event()  # fresh for every attempt
+            self.push(job)
+
+        self.schedule()
+        return job
+
+    def pause(self, job):
+        # an active job stops and frees its slot, .part files are kept
+        with self.lock:
+            job.resume_requested = False
+        job.pause()
+        self.drop_waiting(job)
+
+    def resume(self, job):
+        if job.state in (PAUSED, FAILED):
+            self.submit(job)
+
+    def cancel(self, job):
+        job.cancel()
+        self.drop_waiting(job)
+        self.schedule()
+
+    def set_max_active(self, max_active):
+        self.max_active = max(1, max_active)
+        self.schedule()
+
+    def position(self, job):
+        """
+        Returns 1-based place of a waiting job in line, 0 if not waiting.
+        """
+        with self.lock:
+            line = sorted(
+                entry for entry in self.waiting
+                if self.is_current(entry)
+            )
+
+        for i, (_, _, waiting_job) in enumerate(line, start=1):
+            if waiting_job is job:
+                return i
+        return 0
+
+    def stats(self):
+        """
+        Telemetry of running jobs: total rate, stalled count and
+        one snapshot per active job.
+        """
+        with self.lock:
+            active = list(self.active)
+            waiting = sum(1 for e in self.waiting if self.is_current(e))
+
+        snapshots = [job.telemetry.snapshot() for job in active]
+        return {
+            "active": len(active),
+            "waiting": waiting,
+            "rate": sum(snap["rate"] for snap in snapshots),
+            "stalled": sum(1 for snap in snapshots if snap["stalled"]),
+            "jobs": snapshots,
+        }
+
+    def active_count(self):
+        with self.lock:
+            return len(self.active)
+
+    # ----------------------------
+    # Scheduling
+    # ----------------------------
+
+    def push(self, job):
+        job.queue_seq = next(self.seq)
+        heapq.heappush(self.waiting, (job.priority, job.queue_seq, job))
+
+    def drop_waiting(self, job):
+        # finished and paused jobs are not held on to until their
+        # turn comes up
+        with self.lock:
+            if job.state != QUEUED:
+                self.waiting = [e for e in self.waiting if e[2] is not job]
+                heapq.heapify(self.waiting)
+
+    @staticmethod
+    def is_current(entry):
+        _, seq, job = entry
+        return job.state == QUEUED and job.queue_seq == seq
+
+    def schedule(self):
+        started = False
+
+        with self.lock:
+            while len(self.active) < self.max_active and self.waiting:
+                entry = heapq.heappop(self.waiting)
+                if not self.is_current(entry):
+                    continue   # paused or cancelled while waiting
+
+                job = entry[2]
+                self.active.add(job)
+                started = True
+                threading.Thread(
+                    target=self.run_job,
+                    args=(job,),
+                    daemon=True
+                ).start()
+
+            if self.active and not self.heartbeat:
+                self.heartbeat = threading.Thread(
+                    target=self.run_heartbeat,
+                    daemon=True
+                )
+                self.heartbeat.start()
+
+            waiting = [e[2] for e in self.waiting if self.is_current(e)]
+
+        if started:
+            # everyone behind moved up in line
+            for job in waiting:
+                job.notify()
+
+    def run_heartbeat(self):
+        while True:
+            time.sleep(HEARTBEAT_INTERVAL)
+
+            with self.lock:
+                active = list(self.active)
+                if not active:
+                    self.heartbeat = None
+                    return
+
+            for job in active:
+                job.notify()
+
+    def run_job(self, job):
+        try:
+            job.run()
+        finally:
+            with self.lock:
+                self.active.discard(job)
+                resubmit = job.resume_requested and job.state in (PAUSED, FAILED)
+                job.resume_requested = False
+
+            if resubmit:
+                self.submit(job)
+            else:
+                self.schedule()
+
+
+download_queue = DownloadQueue()
@@ -1,64 +1,222 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-import threading
-import time
 import os
 import webbrowser
 import subprocess
 from utils.window_pos_helper import center_window
-from tools.ffmpeg_helper import merge_audio_video
 
-from utils.files import safe_filename, get_unique_path
 from utils.formatters import format_time, format_size
 from utils.save_settings import get_default_download_path, save_download_path
-from utils.library_manager import add_to_library
+from utils.files import safe_filename, confirm_existing_file
+from utils.library_manager import find_downloaded
+from utils.urls import video_id_from_url
+from utils.resolver import resolver
+from utils.stream_selection import pick_quality
+from utils.ui_bus import ui_bus
+from download_job import (
+    DownloadJob,
+    QUEUED, CONNECTING, DOWNLOADING, MERGING,
+    PAUSED, COMPLETED, FAILED
+)
+from download_queue import download_queue
 
 
 class DownloadWindow:
-    def __init__(self, parent, yt):
-        self.yt = yt
+    """
+    Resolves url and downloads it. With a quality preset
+    ("best", "720p", "audio", ...) the download starts right away
+    instead of waiting for the user to pick a quality.
+    """
+
+    def __init__(self, parent, url, preset=None):
+        self.url = url
+        self.preset = preset
+        self.yt = None
+        self.job = None   # the window is a view onto this job
+
+        self.last_state = None
+        self.shown = {}   # widget -> last text set on it
+        self.check_existing_file = True
 
-        self.phase = {
-            "stream": None,
-            "label": None,
-            "started": False
-        }
+        self.win = tk.Toplevel(parent)
+        self.win.title("Preparing...")
+        center_window(self.win, 420, 390)
+        self.win.resizable(False, False)
+        self.win.deiconify()
+        self.win.lift()
 
-        self.remaining_mode = "na"  # values: "na", "calculating", "active", "done" 
+        # already downloaded: offer it before touching the network
+        existing = find_downloaded(video_id_from_url(url))
+        if existing:
+            self.build_existing_ui(existing)
+            return
 
+        self.start_resolving()
 
-        self.phase_start_time = None
-        self.total_elapsed_time = 0.0
+    def start_resolving(self):
+        url = self.url
 
-        self.is_downloading = False
-        self.last_speed = 0
-        self.last_remaining = 0
-        self.display_progress = 0
-        self.target_progress = 0    
-        self.start_time = None
-        self.cancel_event = threading.Event()
-        self.merge_done = False  
+        # cached manifests open instantly, stale ones refresh behind
+        cached = resolver.cached(url)
+        if cached:
+            self.on_resolved(cached)
+            if cached.fresh or not self.win.winfo_exists():
+                return
+        else:
+            self.build_loading_ui()
 
-        self.win = tk.Toplevel(parent)
+        self.future = resolver.resolve(url)
+        self.future.add_done_callback(
+            lambda _: ui_bus.post(("metadata", self), self.on_metadata)
+        )
+
+
+    def build_existing_ui(self, entry):
+        self.win.title("Already in Library")
+        center_window(self.win, 420, 200)
+
+        self.final_file_path = entry["path"]
+        self.save_path = tk.StringVar(value=os.path.dirname(entry["path"]))
+
+        self.existing_frame = ttk.Frame(self.win, padding=15)
+        self.existing_frame.pack(fill="both", expand=True)
+
+        title = entry.get("title") or "Unknown"
+        if len(title) > 60:
+            title = f"{title[:60]} ..."
+
+        ttk.Label(self.existing_frame, text=title, wraplength=380).pack(anchor="w", pady=(0, 10))
+
+        ttk.Label(
+            self.existing_frame,
+            text="This video is already downloaded.",
+            foreground="#188038"
+        ).pack(anchor="w")
+
+        ttk.Label(
+            self.existing_frame,
+            text=entry["path"],
+            foreground="#5F6368",
+            wraplength=380
+        ).pack(anchor="w", pady=(2, 10))
+
+        btn_row = ttk.Frame(self.existing_frame)
+        btn_row.pack(pady=(10, 0))
+
+        ttk.Button(
+            btn_row,
+            text="Open",
+            command=self.open_file
+        ).pack(side="left", padx=(0, 16))
+
+        ttk.Button(
+            btn_row,
+            text="Open Folder",
+            command=self.open_folder
+        ).pack(side="left", padx=(0, 16))
+
+        ttk.Button(
+            btn_row,
+            text="Download Again",
+            command=self.download_again
+        ).pack(side="left")
+
+    def download_again(self):
+        self.existing_frame.destroy()
         self.win.title("Preparing...")
         center_window(self.win, 420, 390)
-        self.win.resizable(False, False)
-        self.win.deiconify()
-        self.win.lift()
+
+        # the user already chose to download it once more
+        self.check_existing_file = False
+        self.start_resolving()
+
+    def build_loading_ui(self):
+        self.loading_frame = ttk.Frame(self.win, padding=15)
+        self.loading_frame.pack(fill="both", expand=True)
+
+        ttk.Label(
+            self.loading_frame,
+            text="Loading video info…",
+            foreground="#5F6368"
+        ).pack(anchor="w", pady=(0, 10))
+
+        bar = ttk.Progressbar(self.loading_frame, mode="indeterminate")
+        bar.pack(fill="x")
+        bar.start(15)
+
+    def on_metadata(self):
+        if not self.win.winfo_exists():
+            return
+
+        refreshing = self.yt is not None
 
         try:
-            self.build_ui()
-        except:
+            resolved = self.future.result()
+        except Exception as e:
+            if refreshing:
+                return   # keep the cached data, urls re-resolve on start
+            messagebox.showerror("Error", str(e), parent=self.win)
+            self.win.destroy()
+            return
+
+        if refreshing:
+            self.on_refreshed(resolved)
+        else:
+            self.on_resolved(resolved)
+
+    def on_refreshed(self, resolved):
+        if self.job:
+            return   # already downloading from the cached streams
+
+        fresh = {stream.itag: stream for _, stream in resolved.options}
+        self.stream_map = {
+            label: fresh.get(stream.itag, stream)
+            for label, stream in self.stream_map.items()
+        }
+        self.yt = resolved.yt
+        self.audio = resolved.audio
+
+    def on_resolved(self, resolved):
+        self.yt = resolved.yt
+        self.audio = resolved.audio
+
+        # predict filename (initial assumption)
+        folder = get_default_download_path()
+        filename = safe_filename(self.yt.title) + ".mp4"
+
+        if self.check_existing_file and not confirm_existing_file(folder, filename, parent=self.win):
+            self.win.destroy()
+            return
+
+        if hasattr(self, "loading_frame"):
+            self.loading_frame.destroy()
+
+        try:
+            self.build_ui(resolved.options)
+        except Exception:
             messagebox.showerror(
                 "Unexpected Error",
                 "Pica is unable to download this video.\nAn unexpected error occurred."
             )
             self.win.destroy()
             return
-        self.win.title("Downloading with Pica")
+
+        if self.win.winfo_exists():
+            self.win.title("Downloading with Pica")
+
+        if self.preset and hasattr(self, "quality_var"):
+            choice = pick_quality(resolved.options, self.preset)
+            if choice:
+                self.quality_var.set(choice[0])
+                self.start_download()
 
 
-    def build_ui(self):
+    def build_ui(self, options):
+        if not options:
+            messagebox.showerror("Error", "No downloadable streams found")
+            self.win.destroy()
+            return
+
         self.frame = ttk.Frame(self.win, padding=15)
         self.frame.pack(fill="both", expand=True)
 
@@ -73,71 +231,8 @@ class DownloadWindow:
 
         ttk.Label(self.select_frame, text="Quality:").pack(anchor="w")
 
-        
-        video_streams = (
-            self.yt.streams
-            .filter(file_extension="mp4")
-            .order_by("resolution")
-            .desc()
-        )
-
-
-        best_audio = (
-            self.yt.streams
-            .filter(only_audio=True, mime_type="audio/mp4")
-            .order_by("abr")
-            .desc()
-            .first()
-        )
-
-        # safe fallback
-        if not best_audio:
-            best_audio = (
-                self.yt.streams
-                .filter(only_audio=True)
-                .order_by("abr")
-                .desc()
-                .first()
-            )
-
-
-        streams_by_resolution = {}
-
-        for stream in video_streams:
-            res = stream.resolution
-            if not res:
-                continue
-
-            if res not in streams_by_resolution:
-                streams_by_resolution[res] = stream
-            else:
-                if stream.is_progressive and not streams_by_resolution[res].is_progressive:
-                    streams_by_resolution[res] = stream
-
-        if not streams_by_resolution and not best_audio:
-            messagebox.showerror("Error", "No downloadable streams found")
-            self.win.destroy()
-            return
-
-        self.stream_map = {}
-        options = []
-
-        for res in sorted(
-            streams_by_resolution.keys(),
-            key=lambda x: int(x.replace("p", "")),
-            reverse=True
-        ):
-            stream = streams_by_resolution[res]
-            size_mb = stream.filesize_approx / (1024 * 1024)
-            label = f"{res}  •  {size_mb:.1f} MB"
-            self.stream_map[label] = stream
-            options.append(label)
-
-        if best_audio:
-            size_mb = best_audio.filesize_approx / (1024 * 1024)
-            label = f"Audio  •  {size_mb:.1f} MB"
-            self.stream_map[label] = best_audio
-            options.append(label)
+        self.stream_map = dict(options)
+        options = [label for label, _ in options]
 
         self.quality_var = tk.StringVar(value=options[0])
 
@@ -203,264 +298,175 @@ class DownloadWindow:
             save_download_path(folder)
 
     def start_download(self):
-        self.stream = self.stream_map.get(self.quality_var.get())
-        self.is_progressive = self.stream.is_progressive
-        self.is_audio_only = self.stream.type == "audio"
+        stream = self.stream_map.get(self.quality_var.get())
 
         self.select_frame.destroy()
         center_window(self.win, 420, 280)
 
-        self.action_btn.config(text="Cancel", command=self.cancel_download)
-
-        # show initial state
-        self.status_label.config(text="Status: Connecting…", foreground="#6A1B9A")
-
-        self.remaining_mode = "calculating"
-        self.last_remaining = 0
-
-
-        # initial phase intent (NO progress yet)
-        self.phase["stream"] = self.stream
-        self.phase["label"] = None   # <-- important
-        self.phase["started"] = False
-
-        self.start_time = time.time()
-        self.total_size = self.stream.filesize or self.stream.filesize_approx
-
         self.size_label.config(
-            text=f"File size: {format_size(self.total_size)}"
+            text=f"File size: {format_size(stream.filesize_approx)}"
         )
 
-        self.yt.register_on_progress_callback(self.on_progress)
-
-        self.is_downloading = True
-        self.start_ui_progress_loop()
+        self.action_btn.config(text="Cancel", command=self.cancel_download)
+        self.action_btn.pack_forget()
 
-        self.phase_start_time = time.time()
-        threading.Thread(target=self.download_task, daemon=True).start()
+        self.pause_btn = ttk.Button(
+            self.action_frame,
+            text="Pause",
+            command=self.toggle_pause
+        )
+        self.pause_btn.pack(side="left", padx=(0, 16))
+        self.action_btn.pack(side="left")
+
+        self.job = DownloadJob(
+            self.yt,
+            stream,
+            self.save_path.get(),
+            audio=self.audio
+        )
+        self.job.subscribe(self.on_job_update)
+        self.win.bind("<Destroy>", self.on_destroy)
+        download_queue.submit(self.job)
 
 
     # -------------------------------
-    # UI ticker for smooth progress
+    # Job updates, coalesced by the UI bus
     # -------------------------------
-    def start_ui_progress_loop(self):
-        def tick():
-            # smooth progress bar
-            if self.display_progress < self.target_progress:
-                self.display_progress += 1
-                self.progress.set(self.display_progress)
-                self.percent_label.config(text=f"{self.display_progress}%")
-
-            # ⏱ smooth elapsed time (REAL TIME)
-            if self.start_time:
-                elapsed = time.time() - self.start_time
-                self.elapsed_label.config(
-                    text=f"Elapsed: {format_time(elapsed)}"
-                )
-
-            # 🚀 smooth speed + remaining (cached)
-            self.speed_label.config(
-                text=f"Speed: {format_size(self.last_speed)}/s"
-            )
-
-            if self.remaining_mode == "calculating":
-                self.remaining_label.config(text="Remaining: Calculating")
-            elif self.remaining_mode == "na":
-                self.remaining_label.config(text="Remaining: Na")
-            elif self.remaining_mode == "done":
-                self.remaining_label.config(text="Remaining: 00:00:00")
-            else:  # active
-                self.remaining_label.config(
-                    text=f"Remaining: {format_time(self.last_remaining)}"
-                )
-
-
-            if self.is_downloading:
-                self.win.after(100, tick)
-
-        tick()
-
-
-    def download_task(self):
-
-        try:
-            if self.is_audio_only:
-                folder = self.save_path.get()
-                filename = safe_filename(self.yt.title) + ".m4a"
-                self.final_file_path = get_unique_path(folder, filename)
-
-                self.start_phase(self.stream, "Downloading")
-                self.stream.download(
-                    output_path=folder,
-                    filename=os.path.basename(self.final_file_path)
-                )
-            elif self.is_progressive:
-                folder = self.save_path.get()
-                filename = safe_filename(self.yt.title) + ".mp4"
-                self.final_file_path = get_unique_path(folder, filename)
-
-                self.start_phase(self.stream, "Downloading")
-                self.stream.download(
-                    output_path=folder,
-                    filename=os.path.basename(self.final_file_path)
-                )
+    def on_job_update(self, job):
+        # worker thread: hand over, the bus keeps only the latest
+        ui_bus.post(("job", self), self.render, job)
+
+    def on_destroy(self, event):
+        if event.widget is self.win and self.job:
+            self.job.unsubscribe(self.on_job_update)
+            ui_bus.discard(("job", self))
+
+    def set_text(self, widget, text):
+        # skip widgets whose text did not change
+        if self.shown.get(widget) != text:
+            self.shown[widget] = text
+            widget.config(text=text)
+
+    def render(self, job):
+        if not self.win.winfo_exists():
+            return
 
-            else:
-                self.download_adaptive()
+        if job.state != self.last_state:
+            self.last_state = job.state
+            self.on_state_change(job.state)
 
-            self.remaining_mode = "done"
-            self.last_remaining = 0
+        if job.state == MERGING:
+            self.show_merge_progress(job)
+            return
 
-            # ✅ FORCE final repaint (important)
-            self.remaining_label.config(text="Remaining: 00:00:00")
-            self.win.after(0, self.on_complete)
-        except Exception:
-            pass
-        finally:
-            if self.cancel_event.is_set():
-                try:
-                    if hasattr(self, "final_file_path") and os.path.exists(self.final_file_path):
-                        os.remove(self.final_file_path)
-                except Exception:
-                    pass
-            
-    # merge progress animation
-    # -------------------------------
-    def start_merge_progress(self):
-        self.merge_progress = 0
-        self.merge_done = False
-        self.progress.set(0)
-        self.percent_label.config(text="0%")
-
-        def tick():
-            if self.merge_done:
-                return
-            if self.merge_progress < 95:
-                self.merge_progress += 1
-                self.progress.set(self.merge_progress)
-                self.percent_label.config(text=f"{self.merge_progress}%")
-                self.win.after(80, tick)
-
-        tick()
-
-    def download_adaptive(self):
-        base = self.save_path.get()
-
-        # reset for video download
-        self.start_phase(self.stream, "Downloading Video")
-        video_path = self.stream.download(base, filename="video_only.mp4")
-
-        # prepare audio
-        audio = (
-            self.yt.streams
-            .filter(only_audio=True, mime_type="audio/mp4")
-            .order_by("abr")
-            .desc()
-            .first()
-        ) or (
-            self.yt.streams
-            .filter(only_audio=True)
-            .order_by("abr")
-            .desc()
-            .first()
-        )
+        if job.is_finished:
+            return
 
-        # ✅ show connecting again (new request)
-        self.win.after(
-            0,
-            lambda: self.status_label.config(
-                text="Status: Connecting…",
-                foreground="#6A1B9A"
+        if self.progress.get() != job.percent:
+            self.progress.set(job.percent)
+        self.set_text(self.percent_label, f"{job.percent}%")
+
+        self.set_text(self.elapsed_label, f"Elapsed: {format_time(job.elapsed())}")
+        self.set_text(self.speed_label, f"Speed: {format_size(job.speed)}/s")
+
+        if job.total_size:
+            self.set_text(self.size_label, f"File size: {format_size(job.total_size)}")
+
+        mode = job.remaining_mode
+        if mode == "calculating":
+            remaining = "Remaining: Calculating"
+        elif mode == "na":
+            remaining = "Remaining: Na"
+        elif mode == "done":
+            remaining = "Remaining: 00:00:00"
+        elif mode == "stalled":
+            remaining = "Remaining: Stalled"
+        else:  # active
+            remaining = f"Remaining: {format_time(job.remaining)}"
+        self.set_text(self.remaining_label, remaining)
+
+        if job.state == QUEUED:
+            position = download_queue.position(job)
+            self.set_text(
+                self.status_label,
+                f"Status: Queued (#{position})" if position else "Status: Queued"
             )
-        )
-
-        # start audio phase
-        self.start_phase(audio, "Downloading Audio")
-        audio_path = audio.download(base, filename="audio_only.m4a")
-
 
-        self.win.after(
-            0,
-            lambda *_: (
-                setattr(self, "is_downloading", False),  # STOP main loop
-                self.action_btn.config(state="disabled"),
-                self.status_label.config(text="Status: Merging", foreground="#F4B400"),
-                self.start_merge_progress(),
+    def on_state_change(self, state):
+        self.shown.pop(self.status_label, None)   # configured directly below
+
+        if state == QUEUED:
+            self.status_label.config(text="Status: Queued", foreground="#5F6368")
+        elif state == CONNECTING:
+            self.status_label.config(text="Status: Connecting…", foreground="#6A1B9A")
+        elif state == DOWNLOADING:
+            self.status_label.config(
+                text=f"Status: {self.job.label}",
+                foreground="#1A73E8"
             )
-        )
-
-        safe_title = safe_filename(self.yt.title)
-
-        filename = f"{safe_title}.mp4"
-        output = get_unique_path(base, filename)
-        self.final_file_path = output
-
-
-        self.remaining_mode = "na"
-        self.last_remaining = 0
-        merge_audio_video(video_path, audio_path, output)
+        elif state == MERGING:
+            self.pause_btn.config(state="disabled")
+            self.action_btn.config(state="disabled")
+            self.status_label.config(text="Status: Merging", foreground="#F4B400")
+        elif state == PAUSED:
+            self.status_label.config(text="Status: Paused", foreground="#5F6368")
+            self.pause_btn.config(text="Resume")
+        elif state == COMPLETED:
+            self.on_complete()
+        elif state == FAILED:
+            self.on_failed()
 
-        self.merge_done = True
-        self.is_downloading = False
-        self.target_progress = 100
-        self.display_progress = 100
-
-        if self.cancel_event.is_set():
-            return 
+    # -------------------------------
+    # real merge progress from ffmpeg
+    # -------------------------------
+    def show_merge_progress(self, job):
+        self.progress.set(job.merge_percent)
+        self.set_text(self.percent_label, f"{job.merge_percent}%")
 
-        self.win.after(
-            0,
-            lambda *_: (
-                self.progress.set(100),
-                self.percent_label.config(text="100%")
-            )
+        self.set_text(
+            self.speed_label,
+            f"Speed: {job.merge_speed:.1f}x" if job.merge_speed else "Speed: Na"
         )
+        self.set_text(self.elapsed_label, f"Elapsed: {format_time(job.elapsed())}")
 
-        try:
-            os.remove(video_path)
-            os.remove(audio_path)
-        except Exception:
-            pass
-
-    def start_phase(self, stream, label):
-
-        # ⏱ close previous phase timing
-        if self.phase_start_time is not None:
-            self.total_elapsed_time += time.time() - self.phase_start_time
-
-        # start new phase timing
-        self.phase_start_time = time.time()
-
-        self.phase["stream"] = stream
-        self.phase["label"] = label
-        self.phase["started"] = False
-
-        # ✅ RESET remaining logic HERE
-        self.remaining_mode = "calculating"
-        self.last_remaining = 0
-
-        self.total_size = stream.filesize or stream.filesize_approx
-        self.start_time = time.time()
+        if job.remaining_mode == "active":
+            self.set_text(
+                self.remaining_label,
+                f"Remaining: {format_time(job.remaining)}"
+            )
+        else:
+            self.set_text(self.remaining_label, "Remaining: Calculating")
 
-        self.display_progress = 0
-        self.target_progress = 0
-        self.last_speed = 0
-        self.last_remaining = 0
+    def cancel_download(self):
+        if self.job:
+            download_queue.cancel(self.job)
+        self.status_label.config(text="Status: Cancelled", foreground="#D93025")
+        self.win.after(600, self.win.destroy)
 
-        self.progress.set(0)
-        self.percent_label.config(text="0%")
-        self.size_label.config(
-            text=f"File size: {format_size(self.total_size)}"
+    def toggle_pause(self):
+        if self.job.state == PAUSED:
+            self.pause_btn.config(text="Pause")
+            download_queue.resume(self.job)
+        elif not self.job.is_finished:
+            download_queue.pause(self.job)
+
+    def on_failed(self):
+        self.pause_btn.pack_forget()
+        self.action_btn.config(state="normal")
+        self.status_label.config(
+            text="Status: Failed – Retry resumes where it stopped",
+            foreground="#D93025"
         )
+        self.action_btn.config(text="Retry", command=self.retry_download)
 
-        self.yt.register_on_progress_callback(self.on_progress)
-
+    def retry_download(self):
+        self.action_btn.config(text="Cancel", command=self.cancel_download)
+        self.action_btn.pack_forget()
+        self.pause_btn.config(text="Pause", state="normal")
+        self.pause_btn.pack(side="left", padx=(0, 16))
+        self.action_btn.pack(side="left")
 
-
-    def cancel_download(self):
-        self.cancel_event.set()
-        self.status_label.config(text="Status: Cancelled", foreground="#D93025")
-        self.win.after(600, self.win.destroy)
+        download_queue.resume(self.job)
 
     def highlight_window(self):
         try:
@@ -481,22 +487,12 @@ class DownloadWindow:
 
 
     def on_complete(self):
-        if self.cancel_event.is_set():
-            return  
+        self.final_file_path = self.job.final_file_path
 
-        # ⏱ close last phase
-        if self.phase_start_time is not None:
-            self.total_elapsed_time += time.time() - self.phase_start_time
-            self.phase_start_time = None
-
-        self.is_downloading = False
-        self.target_progress = 100
-        self.display_progress = 100
         self.progress.set(100)
-        self.percent_label.config(text="100%")
-        self.elapsed_label.config(
-            text=f"Elapsed: {format_time(self.total_elapsed_time)}"
-        )
+        self.set_text(self.percent_label, "100%")
+        self.set_text(self.remaining_label, "Remaining: 00:00:00")
+        self.set_text(self.elapsed_label, f"Elapsed: {format_time(self.job.elapsed())}")
 
         self.status_label.config(text="Status: Completed", foreground="#188038")
 
@@ -539,12 +535,6 @@ class DownloadWindow:
         support.bind("<Button-1>", self.open_support_link)
 
 
-        # Add to Library
-        try:
-            add_to_library(self.yt, self.final_file_path)
-        except Exception:
-            pass
-
         self.highlight_window()
 
 
@@ -587,35 +577,3 @@ class DownloadWindow:
 
         # close download window
         self.win.after(200, self.win.destroy)
-
-
-    # -------------------------------
-    # download callback (NO UI here)
-    # -------------------------------
-    def on_progress(self, stream, chunk, bytes_remaining):
-        if stream != self.phase["stream"]:
-            return
-        if self.cancel_event.is_set():
-            return
-
-        if not self.phase["started"]:
-            self.phase["started"] = True
-            self.remaining_mode = "active"
-            self.win.after(
-                0,
-                lambda: self.status_label.config(
-                    text=f"Status: {self.phase['label']}",
-                    foreground="#1A73E8"
-                )
-            )
-
-
-        downloaded = self.total_size - bytes_remaining
-        self.target_progress = int(downloaded / self.total_size * 100)
-
-        elapsed = time.time() - self.start_time
-        speed = downloaded / elapsed if elapsed > 0 else 0
-        remaining = (self.total_size - downloaded) / speed if speed > 0 else 0
-
-        self.last_speed = speed
-        self.last_remaining = remaining
@@ -3,14 +3,16 @@ from tkinter import ttk, messagebox
 import os
 import sys
 import subprocess
-import hashlib
+import threading
+from bisect import bisect_right
 from datetime import datetime
-from PIL import Image, ImageTk
-from utils.app_paths import app_cache_dir
 from utils.humanize_date import humanize_date
+from utils.ui_bus import ui_bus
+from utils.thumbnail_loader import thumbnail_loader, get_placeholder, VISIBLE, NEARBY
 from utils.library_manager import (
     load_library,
-    remove_from_library,
+    library_by_author,
+    remove_many_from_library,
     get_library_count
 )
 
@@ -21,7 +23,19 @@ from utils.library_manager import (
 THUMB_SIZE = (440, 248)
 COLUMNS = 4
 
-THUMB_CACHE_DIR = app_cache_dir("thumbs")
+# cards have a fixed size, so rows are placed without measuring widgets
+CARD_PAD = 12
+CARD_WIDTH = THUMB_SIZE[0] + 2
+CARD_HEIGHT = THUMB_SIZE[1] + 96
+ROW_HEIGHT = CARD_HEIGHT + 2 * CARD_PAD
+HEADER_HEIGHT = 48
+GROUP_GAP = 30
+GRID_PADDING = 15
+
+# rows built beyond the visible area, short scrolls find them ready
+OVERSCAN_ROWS = 1
+
+SCROLL_STEP = 40
 
 
 # ------------------------------
@@ -56,12 +70,143 @@ def open_file_location(path):
         subprocess.Popen(["xdg-open", os.path.dirname(path)])
 
 
+# ------------------------------
+# Library Card (recycled)
+# ------------------------------
+
+class LibraryCard:
+    """
+    One card widget of the pool. It shows whichever entry it is
+    bound to and moves around the canvas as the user scrolls.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.entry = None
+        self.request = None   # pending thumbnail decode
+
+        canvas = window.canvas
+        self.frame = tk.Frame(
+            canvas,
+            bd=1,
+            relief="solid",
+            bg="white",
+            width=CARD_WIDTH,
+            height=CARD_HEIGHT
+        )
+        self.frame.pack_propagate(False)
+
+        self.thumb = ttk.Label(self.frame, image=window.placeholder)
+        self.thumb.image = window.placeholder
+        self.thumb.pack()
+
+        # handlers look the entry up when clicked, the card is reused
+        self.thumb.bind("<Button-1>", lambda e: self.entry and window.on_open(self.entry))
+        self.thumb.bind("<Button-3>", lambda e: self.entry and window.show_context_menu(e, self.entry))
+
+        window.bind_hover(self.frame)
+
+        # Video title
+        self.title = ttk.Label(
+            self.frame,
+            font=("Segoe UI", 10, "bold"),
+            wraplength=THUMB_SIZE[0],
+            justify="left",
+            background="white"
+        )
+        self.title.pack(anchor="w", padx=8, pady=(8, 2))
+
+        # Author
+        self.author = ttk.Label(
+            self.frame,
+            font=("Segoe UI", 10),
+            foreground="#666",
+            background="white"
+        )
+        self.author.pack(anchor="w", padx=8, pady=(0, 2))
+
+        # Uploaded ago
+        self.uploaded = ttk.Label(
+            self.frame,
+            font=("Segoe UI", 10, "bold"),
+            foreground="#555",
+            background="white"
+        )
+        self.uploaded.pack(anchor="w", padx=8, pady=(0, 8))
+
+        self.item = canvas.create_window(
+            0, 0,
+            window=self.frame,
+            anchor="nw",
+            width=CARD_WIDTH,
+            height=CARD_HEIGHT,
+            state="hidden"
+        )
+
+    def bind(self, entry, priority=VISIBLE):
+        self.cancel_thumb()
+        self.entry = entry
+
+        video_title = entry.get("title", "Unknown title")
+        if len(video_title) > 50:
+            video_title = video_title[:47] + "..."
+
+        self.title.config(text=video_title)
+        self.author.config(text=entry.get("author", "Unknown"))
+        self.uploaded.config(
+            text=f"Uploaded • {humanize_date(entry.get('publish_date', ''))}"
+        )
+
+        self.set_image(self.window.placeholder)
+
+        video_id = entry.get("id", "")
+        if video_id:
+            self.request = thumbnail_loader.request(
+                video_id,
+                THUMB_SIZE,
+                self.on_thumb,
+                priority=priority
+            )
+
+    def on_thumb(self, photo):
+        # Tk thread, the request was cancelled if the card moved on
+        self.request = None
+        if photo is not None:
+            self.set_image(photo)
+
+    def cancel_thumb(self):
+        if self.request:
+            self.request.cancel()
+            self.request = None
+
+    def set_image(self, img):
+        self.thumb.image = img
+        self.thumb.config(image=img)
+
+    def show(self, x, y):
+        canvas = self.window.canvas
+        canvas.coords(self.item, x, y)
+        canvas.itemconfigure(self.item, state="normal")
+
+    def hide(self):
+        self.cancel_thumb()
+        self.entry = None
+        self.set_image(self.window.placeholder)
+        self.window.canvas.itemconfigure(self.item, state="hidden")
+
 
 # ------------------------------
 # Library Window
 # ------------------------------
 
 class LibraryWindow:
+    """
+    Library grid grouped by author. Only the rows in view have
+    widgets: a small pool of cards, headers and separators is moved
+    around the canvas while scrolling, so opening and scrolling cost
+    the same for 50 or 20,000 downloads.
+    """
+
     def __init__(self, parent):
         self.parent = parent
         self.win = tk.Toplevel(parent)
@@ -71,7 +216,14 @@ class LibraryWindow:
         self.win.lift()
 
         self.entries = []
-        self.thumbnails = []  # keep references
+        self.rows = []          # (top, kind, payload), kind: header / cards / separator
+        self.row_tops = []
+        self.cards = []         # card pool
+        self.headers = []       # canvas text items
+        self.separators = []    # canvas line items
+        self.update_pending = False
+
+        self.placeholder = get_placeholder(THUMB_SIZE)
 
         self.build_ui()
         self.load_library()
@@ -105,180 +257,212 @@ class LibraryWindow:
         outer = ttk.Frame(self.win)
         outer.pack(fill="both", expand=True)
 
-        self.canvas = tk.Canvas(outer, highlightthickness=0)
+        self.canvas = tk.Canvas(
+            outer,
+            highlightthickness=0,
+            yscrollincrement=SCROLL_STEP
+        )
         self.canvas.pack(side="left", fill="both", expand=True)
 
         scrollbar = ttk.Scrollbar(
-            outer, orient="vertical", command=self.canvas.yview
+            outer, orient="vertical", command=self.yview
         )
         scrollbar.pack(side="right", fill="y")
 
         self.canvas.configure(yscrollcommand=scrollbar.set)
+        self.canvas.bind("<Configure>", lambda e: self.schedule_update())
 
-        self.grid_frame = ttk.Frame(self.canvas, padding=15)
-        self.canvas.create_window((0, 0), window=self.grid_frame, anchor="nw")
+        # the toplevel sees wheel events of every card inside it
+        self.win.bind("<MouseWheel>", self.on_mousewheel)
+        self.win.bind("<Button-4>", lambda e: self.scroll(-3))
+        self.win.bind("<Button-5>", lambda e: self.scroll(3))
+        self.win.bind("<Destroy>", self.on_destroy)
 
-        self.grid_frame.bind(
-            "<Configure>",
-            lambda e: self.canvas.configure(
-                scrollregion=self.canvas.bbox("all")
-            )
-        )
+    def on_destroy(self, event):
+        # queued decodes are useless once the window is gone
+        if event.widget is self.win:
+            for card in self.cards:
+                card.cancel_thumb()
 
     # ------------------------------
+    # Scrolling
+    # ------------------------------
 
-    def validate_library_entries(self, entries):
-        valid_entries = []
+    def yview(self, *args):
+        self.canvas.yview(*args)
+        self.schedule_update()
 
-        for item in entries:
-            path = item.get("path", "")
-            if path and os.path.exists(path):
-                valid_entries.append(item)
-            else:
-                # silently remove missing file entry
-                self.remove_entry(item)
+    def scroll(self, units):
+        self.canvas.yview_scroll(units, "units")
+        self.schedule_update()
 
-        valid_entries.sort(
-            key=lambda x: x.get("downloaded_at", ""),
-            reverse=True
-        )
-        return valid_entries[:50]
+    def on_mousewheel(self, event):
+        self.scroll(-3 if event.delta > 0 else 3)
+
+    def schedule_update(self):
+        # many scroll events per frame, one re-layout
+        if not self.update_pending:
+            self.update_pending = True
+            self.win.after_idle(self.update_visible)
 
     # ------------------------------
 
-    def load_library(self):
-        entries = load_library()
-        self.entries = self.validate_library_entries(entries)
+    def validate_library_entries(self, entries):
+        """
+        Runs off the Tk thread: finds entries whose file is gone.
+        """
+        missing = [
+            item.get("id") for item in entries
+            if not (item.get("path") and os.path.exists(item.get("path")))
+        ]
 
-        # ✅ Sort by download time (newest first)
-        self.entries.sort(
-            key=lambda x: x.get("downloaded_at", ""),
-            reverse=True
-        )
+        if missing:
+            ui_bus.post(("library", self), self.apply_validation, missing)
 
-        grouped = {}
-        for item in self.entries:
-            author = item.get("author", "Unknown")
-            grouped.setdefault(author, []).append(item)
+    def apply_validation(self, missing):
+        # silently remove missing file entries, one commit for all
+        remove_many_from_library(missing)
 
-        for author, items in grouped.items():
-            self.render_author_group(author, items)
+        if self.win.winfo_exists():
+            self.show_entries(keep_scroll=True)
 
     # ------------------------------
 
-    def render_author_group(self, author, items):
-        ttk.Label(
-            self.grid_frame,
-            text=author,
-            font=("Segoe UI", 11, "bold")
-        ).pack(anchor="w", pady=(20, 8))
+    def load_library(self):
+        self.show_entries()
 
-        group_frame = ttk.Frame(self.grid_frame)
-        group_frame.pack(fill="x")
+        # file checks touch every entry, keep them off the Tk thread
+        threading.Thread(
+            target=self.validate_library_entries,
+            args=(self.entries,),
+            daemon=True
+        ).start()
 
-        row = col = 0
-        for item in items:
-            self.render_item(item, group_frame, row, col)
-            col += 1
-            if col >= COLUMNS:
-                col = 0
-                row += 1
+    def show_entries(self, keep_scroll=False):
+        # entries and author groups come precomputed from the library cache
+        self.entries = load_library(newest_first=True)
+        self.build_layout(library_by_author())
 
-        ttk.Separator(self.grid_frame).pack(fill="x", pady=(15, 5))
+        self.title_label.config(
+            text=f"Library ({len(self.entries)})"
+        )
 
-    # ------------------------------
-    # Thumbnail helpers
-    # ------------------------------
+        for card in self.cards:
+            card.hide()
+        if not keep_scroll:
+            self.canvas.yview_moveto(0)
+        self.schedule_update()
 
-    @staticmethod
-    def get_thumb_path(original_path):
-        name = hashlib.md5(original_path.encode()).hexdigest()
-        return os.path.join(THUMB_CACHE_DIR, f"{name}.jpg")
+    def build_layout(self, groups):
+        rows = []
+        y = GRID_PADDING
 
-    def load_thumbnail(self, path):
-        try:
-            thumb_path = self.get_thumb_path(path)
+        for author, items in groups.items():
+            rows.append((y, "header", author))
+            y += HEADER_HEIGHT
 
-            if os.path.exists(thumb_path):
-                with Image.open(thumb_path) as im:
-                    img = im.copy()
-            else:
-                with Image.open(path) as im:
-                    im.thumbnail(THUMB_SIZE, Image.BILINEAR)
-                    im.save(thumb_path, "JPEG", quality=85, optimize=True)
-                    img = im.copy()
+            for i in range(0, len(items), COLUMNS):
+                rows.append((y, "cards", items[i:i + COLUMNS]))
+                y += ROW_HEIGHT
+
+            rows.append((y, "separator", None))
+            y += GROUP_GAP
 
-            return ImageTk.PhotoImage(img)
+        self.rows = rows
+        self.row_tops = [row[0] for row in rows]
 
-        except Exception:
-            img = Image.new("RGB", THUMB_SIZE, "#222")
-            return ImageTk.PhotoImage(img)
+        width = 2 * GRID_PADDING + COLUMNS * (CARD_WIDTH + 2 * CARD_PAD)
+        self.canvas.configure(scrollregion=(0, 0, width, y + GRID_PADDING))
 
     # ------------------------------
+    # Virtualized rendering
+    # ------------------------------
 
-    def render_item(self, item, parent, row, col):
-        card = tk.Frame(parent, bd=1, relief="solid", bg="white")
-        card.grid(row=row, column=col, padx=12, pady=12, sticky="n")
+    def update_visible(self):
+        self.update_pending = False
+        if not self.win.winfo_exists():
+            return
 
-        placeholder = ImageTk.PhotoImage(
-            Image.new("RGB", THUMB_SIZE, "#222")
-        )
-        self.thumbnails.append(placeholder)
+        top = self.canvas.canvasy(0)
+        bottom = top + self.canvas.winfo_height()
 
-        thumb = ttk.Label(card, image=placeholder)
-        thumb.image = placeholder
-        thumb.pack()
+        first = max(0, bisect_right(self.row_tops, top) - 1 - OVERSCAN_ROWS)
+        last = bisect_right(self.row_tops, bottom) + OVERSCAN_ROWS
 
-        self.win.after(
-            10,
-            lambda p=item.get("thumbnail", ""), l=thumb: self.set_thumb(p, l)
-        )
+        slots = []
+        header_count = separator_count = 0
 
-        thumb.bind("<Button-1>", lambda e, i=item: self.on_open(i))
-        thumb.bind("<Button-3>", lambda e, i=item: self.show_context_menu(e, i))
+        for row_top, kind, payload in self.rows[first:last]:
+            # rows only in the overscan margin load after the visible ones
+            visible = row_top + ROW_HEIGHT > top and row_top < bottom
+            priority = VISIBLE if visible else NEARBY
 
-        self.bind_hover(card)
+            if kind == "header":
+                self.place_header(header_count, row_top, payload)
+                header_count += 1
+            elif kind == "separator":
+                self.place_separator(separator_count, row_top)
+                separator_count += 1
+            else:
+                for col, entry in enumerate(payload):
+                    x = GRID_PADDING + CARD_PAD + col * (CARD_WIDTH + 2 * CARD_PAD)
+                    slots.append((x, row_top + CARD_PAD, entry, priority))
+
+        for item in self.headers[header_count:] + self.separators[separator_count:]:
+            self.canvas.itemconfigure(item, state="hidden")
+
+        self.place_cards(slots)
+
+    def place_cards(self, slots):
+        # cards still showing their entry only move, no re-bind
+        bound = {card.entry.id: card for card in self.cards if card.entry}
+        used = set()
+        unbound = []
+
+        for x, y, entry, priority in slots:
+            card = bound.get(entry.id)
+            if card:
+                card.show(x, y)
+                used.add(card)
+            else:
+                unbound.append((x, y, entry, priority))
 
-        video_title=item.get("title", "Unknown title")
-        if len(video_title) > 50:
-            video_title = video_title[:47] + "..."
+        free = [card for card in self.cards if card not in used]
 
-        # Video title
-        ttk.Label(
-            card,
-            text=video_title,
-            font=("Segoe UI", 10, "bold"),
-            wraplength=THUMB_SIZE[0],
-            justify="left",
-            background="white"
-        ).pack(anchor="w", padx=8, pady=(8, 2))
+        for x, y, entry, priority in unbound:
+            card = free.pop() if free else self.new_card()
+            card.bind(entry, priority)
+            card.show(x, y)
 
-        # Author
-        ttk.Label(
-            card,
-            text=item.get("author", "Unknown"),
-            font=("Segoe UI", 10),
-            foreground="#666",
-            background="white"
-        ).pack(anchor="w", padx=8, pady=(0, 2))
+        for card in free:
+            if card.entry:
+                card.hide()
 
-        # Uploaded ago
-        ttk.Label(
-            card,
-            text=f"Uploaded • {humanize_date(item.get('publish_date', ''))}",
-            font=("Segoe UI", 10, "bold"),
-            foreground="#555",
-            background="white"
-        ).pack(anchor="w", padx=8, pady=(0, 8))
+    def new_card(self):
+        card = LibraryCard(self)
+        self.cards.append(card)
+        return card
 
+    def place_header(self, index, y, author):
+        if index == len(self.headers):
+            self.headers.append(self.canvas.create_text(
+                0, 0,
+                anchor="nw",
+                font=("Segoe UI", 11, "bold")
+            ))
 
-    # ------------------------------
+        item = self.headers[index]
+        self.canvas.coords(item, GRID_PADDING, y + 20)
+        self.canvas.itemconfigure(item, text=author, state="normal")
 
-    def set_thumb(self, path, label):
-        img = self.load_thumbnail(path)
-        label.image = img
-        label.config(image=img)
-        self.thumbnails.append(img)
+    def place_separator(self, index, y):
+        if index == len(self.separators):
+            self.separators.append(self.canvas.create_line(0, 0, 0, 0, fill="#d9d9d9"))
+
+        item = self.separators[index]
+        width = COLUMNS * (CARD_WIDTH + 2 * CARD_PAD)
+        self.canvas.coords(item, GRID_PADDING, y + 15, GRID_PADDING + width, y + 15)
+        self.canvas.itemconfigure(item, state="normal")
 
     # ------------------------------
 
@@ -318,18 +502,9 @@ class LibraryWindow:
     # ------------------------------
 
     def remove_entry(self, item):
-        self.entries = remove_from_library(item.get("id"))
+        remove_many_from_library([item.get("id")])
 
     # ------------------------------
 
     def refresh(self):
-        for widget in self.grid_frame.winfo_children():
-            widget.destroy()
-
-        self.thumbnails.clear()
         self.load_library()
-
-        # update header count
-        self.title_label.config(
-            text=f"Library ({get_library_count()})"
-        )
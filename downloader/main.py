@@ -1,12 +1,26 @@
-import tkinter as tk
 import traceback
 import sys
 import os
 
 def main():
-    root = tk.Tk()
+    from utils.single_instance import SingleInstance
+
+    # already running: hand the arguments over and leave
+    args = sys.argv[1:]
+    instance = SingleInstance()
+    if not instance.acquire():
+        instance.forward(args)
+        return
+
+    # imported only by the instance that keeps running
+    import tkinter as tk
     from app import Pica
-    Pica(root)
+
+    root = tk.Tk()
+    app = Pica(root)
+    instance.listen(app.forward_launch)
+    if args:
+        app.handle_launch(args)
     root.mainloop()
 
 if __name__ == "__main__":
@@ -0,0 +1,248 @@
+import threading
+from urllib.parse import urlparse, parse_qs
+from pytubefix import Playlist, Channel
+from pytubefix.extract import video_id as extract_video_id
+
+from utils.library_manager import get_library_ids
+from utils.resolver import resolver
+from utils.stream_selection import pick_quality
+from download_job import DownloadJob, LOW, COMPLETED, FAILED, CANCELLED
+from download_queue import download_queue
+
+
+# ----------------------------
+# Config
+# ----------------------------
+
+# videos of one batch being resolved at the same time, kept below
+# the resolver pool size so single videos opened meanwhile still
+# get a worker
+BATCH_RESOLVE_PARALLELISM = 3
+
+CHANNEL_PREFIXES = ("/@", "/channel/", "/c/", "/user/")
+
+
+# ----------------------------
+# URL helpers
+# ----------------------------
+
+def collection_kind(url):
+    """
+    Returns "playlist", "channel" or None for a single video url.
+    """
+    try:
+        parsed = urlparse(url)
+    except Exception:
+        return None
+
+    if parsed.path.rstrip("/") == "/playlist" and parse_qs(parsed.query).get("list"):
+        return "playlist"
+    if parsed.path.startswith(CHANNEL_PREFIXES):
+        return "channel"
+    return None
+
+
+def iter_video_urls(url):
+    """
+    Yields the watch urls of a playlist or channel page by page,
+    so callers can start on the first videos right away.
+    """
+    if collection_kind(url) == "channel":
+        collection = Channel(url)
+    else:
+        collection = Playlist(url)
+
+    yield from collection.url_generator()
+
+
+class PlaylistBatch:
+    """
+    Downloads every video of a playlist or channel with one quality
+    preset. Expansion, resolution and queueing overlap: each video
+    becomes a LOW priority DownloadJob as soon as it is resolved.
+    Videos already in the library are skipped.
+
+    Listeners are called with the batch whenever counts change,
+    on_job(job) with every job just before it is queued. speed_limit
+    (bytes/s) caps each job of the batch.
+    """
+
+    def __init__(self, url, folder, preset="best",
+                 parallelism=BATCH_RESOLVE_PARALLELISM, on_job=None,
+                 speed_limit=0):
+        self.url = url
+        self.folder = folder
+        self.preset = preset
+        self.speed_limit = speed_limit
+        self.parallelism = parallelism
+        self.on_job = on_job
+
+        self.lock = threading.Lock()
+        self.listeners = []
+        self.cancel_event = threading.Event()
+        self.jobs = []
+
+        self.found = 0        # unique videos seen so far
+        self.skipped = 0      # already in the library
+        self.failed = 0       # could not be resolved or no matching stream
+        self.expanding = False
+        self.error = None     # expansion itself failed
+
+    # ----------------------------
+    # Read side
+    # ----------------------------
+
+    @property
+    def queued(self):
+        return len(self.jobs)
+
+    @property
+    def completed(self):
+        return sum(1 for job in self.jobs if job.state == COMPLETED)
+
+    @property
+    def job_failures(self):
+        return sum(1 for job in self.jobs if job.state == FAILED)
+
+    @property
+    def is_finished(self):
+        return not self.expanding and all(job.is_finished for job in self.jobs)
+
+    # ----------------------------
+    # Listeners
+    # ----------------------------
+
+    def subscribe(self, listener):
+        if listener not in self.listeners:
+            self.listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    def notify(self, *_):
+        for listener in list(self.listeners):
+            try:
+                listener(self)
+            except Exception:
+                pass
+
+    # ----------------------------
+    # Control
+    # ----------------------------
+
+    def start(self):
+        self.expanding = True
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def cancel(self):
+        self.cancel_event.set()
+        for job in list(self.jobs):
+            if job.state != CANCELLED:
+                download_queue.cancel(job)
+        self.notify()
+
+    # ----------------------------
+    # Expansion
+    # ----------------------------
+
+    def run(self):
+        known = get_library_ids()
+        seen = set()
+        slots = threading.Semaphore(self.parallelism)
+        pending = []
+
+        try:
+            for url in iter_video_urls(self.url):
+                if self.cancel_event.is_set():
+                    break
+
+                try:
+                    video_id = extract_video_id(url)
+                except Exception:
+                    continue
+
+                if video_id in seen:
+                    continue
+                seen.add(video_id)
+
+                with self.lock:
+                    self.found += 1
+                    if video_id in known:
+                        self.skipped += 1
+                if video_id in known:
+                    self.notify()
+                    continue
+
+                # bounded parallelism, expansion waits for a free slot
+                while not slots.acquire(timeout=0.5):
+                    if self.cancel_event.is_set():
+                        break
+                else:
+                    pending.append(self.resolve(url, slots))
+                    self.notify()
+        except Exception as e:
+            self.error = e
+
+        for done in pending:
+            done.wait()
+
+        self.expanding = False
+        self.notify()
+
+    def resolve(self, url, slots):
+        done = threading.Event()
+
+        def finish(resolved=None, error=None):
+            try:
+                if resolved is not None and not self.cancel_event.is_set():
+                    self.queue(resolved)
+                elif error is not None:
+                    with self.lock:
+                        self.failed += 1
+            finally:
+                slots.release()
+                done.set()
+                self.notify()
+
+        # a fresh cached manifest skips the network entirely
+        cached = resolver.cached(url)
+        if cached and cached.fresh:
+            finish(cached)
+            return done
+
+        future = resolver.resolve(url)
+
+        def on_done(f):
+            try:
+                resolved = f.result()
+            except Exception as e:
+                finish(error=e)
+                return
+            finish(resolved)
+
+        future.add_done_callback(on_done)
+        return done
+
+    def queue(self, resolved):
+        choice = pick_quality(resolved.options, self.preset)
+        if not choice:
+            with self.lock:
+                self.failed += 1
+            return
+
+        job = DownloadJob(
+            resolved.yt,
+            choice[1],
+            self.folder,
+            priority=LOW,
+            speed_limit=self.speed_limit,
+            audio=resolved.audio
+        )
+        job.subscribe(self.notify)
+        if self.on_job:
+            self.on_job(job)
+
+        with self.lock:
+            self.jobs.append(job)
+        download_queue.submit(job)
@@ -0,0 +1,165 @@
+import tkinter as tk
+from tkinter import ttk, filedialog
+from utils.window_pos_helper import center_window
+
+from utils.save_settings import get_default_download_path, save_download_path
+from utils.stream_selection import QUALITY_PRESETS
+from utils.ui_bus import ui_bus
+from playlist_batch import PlaylistBatch, collection_kind
+
+
+class PlaylistWindow:
+    """
+    Downloads a whole playlist or channel with one quality preset.
+    With a preset given the batch starts right away.
+    """
+
+    def __init__(self, parent, url, preset=None):
+        self.url = url
+        self.batch = None
+
+        kind = collection_kind(url) or "playlist"
+
+        self.win = tk.Toplevel(parent)
+        self.win.title(f"Download {kind.title()} with Pica")
+        center_window(self.win, 420, 300)
+        self.win.resizable(False, False)
+        self.win.deiconify()
+        self.win.lift()
+
+        self.build_ui(kind)
+
+        if preset:
+            self.quality_var.set(preset)
+            self.start()
+
+    def build_ui(self, kind):
+        self.frame = ttk.Frame(self.win, padding=15)
+        self.frame.pack(fill="both", expand=True)
+
+        ttk.Label(
+            self.frame,
+            text=self.url if len(self.url) <= 60 else f"{self.url[:60]} ...",
+            wraplength=380
+        ).pack(anchor="w", pady=(0, 10))
+
+        self.select_frame = ttk.Frame(self.frame)
+        self.select_frame.pack(fill="x")
+
+        ttk.Label(self.select_frame, text="Quality for every video:").pack(anchor="w")
+
+        self.quality_var = tk.StringVar(value=QUALITY_PRESETS[0])
+
+        ttk.Combobox(
+            self.select_frame,
+            textvariable=self.quality_var,
+            values=QUALITY_PRESETS,
+            state="readonly"
+        ).pack(fill="x", pady=(5, 10))
+
+        self.save_path = tk.StringVar(value=get_default_download_path())
+
+        ttk.Button(
+            self.select_frame,
+            text="Choose Save Location",
+            command=self.choose_folder
+        ).pack(anchor="w")
+
+        ttk.Label(
+            self.select_frame,
+            textvariable=self.save_path
+        ).pack(anchor="w", pady=(2, 10))
+
+        self.progress = tk.IntVar(value=0)
+
+        ttk.Progressbar(
+            self.frame,
+            variable=self.progress
+        ).pack(fill="x", pady=(10, 2))
+
+        self.count_label = ttk.Label(self.frame, text="Videos: Na")
+        self.count_label.pack(anchor="w")
+
+        self.status_label = ttk.Label(self.frame, text="Status: Waiting", foreground="#5F6368")
+        self.status_label.pack(anchor="w", pady=(5, 5))
+
+        self.action_btn = ttk.Button(
+            self.frame,
+            text=f"Download {kind.title()}",
+            command=self.start
+        )
+        self.action_btn.pack(pady=(10, 0))
+
+    def choose_folder(self):
+        folder = filedialog.askdirectory(initialdir=self.save_path.get())
+        if folder:
+            self.save_path.set(folder)
+            save_download_path(folder)
+
+    def start(self):
+        self.select_frame.destroy()
+        center_window(self.win, 420, 200)
+
+        self.action_btn.config(text="Cancel", command=self.cancel)
+        self.status_label.config(text="Status: Finding videos…", foreground="#6A1B9A")
+
+        self.batch = PlaylistBatch(
+            self.url,
+            self.save_path.get(),
+            preset=self.quality_var.get()
+        )
+        self.batch.subscribe(self.on_batch_update)
+        self.win.bind("<Destroy>", self.on_destroy)
+        self.batch.start()
+
+    # -------------------------------
+    # Batch updates, coalesced by the UI bus
+    # -------------------------------
+    def on_batch_update(self, batch):
+        ui_bus.post(("batch", self), self.render, batch)
+
+    def on_destroy(self, event):
+        if event.widget is self.win and self.batch:
+            self.batch.unsubscribe(self.on_batch_update)
+            ui_bus.discard(("batch", self))
+
+    def render(self, batch):
+        if not self.win.winfo_exists():
+            return
+
+        completed = batch.completed
+        queued = batch.queued
+
+        if queued:
+            self.progress.set(int(completed / queued * 100))
+
+        parts = [f"Found: {batch.found}", f"Queued: {queued}", f"Done: {completed}"]
+        if batch.skipped:
+            parts.append(f"In library: {batch.skipped}")
+        failed = batch.failed + batch.job_failures
+        if failed:
+            parts.append(f"Failed: {failed}")
+        self.count_label.config(text="  •  ".join(parts))
+
+        if batch.cancel_event.is_set():
+            self.status_label.config(text="Status: Cancelled", foreground="#D93025")
+        elif batch.error and not batch.found:
+            self.status_label.config(
+                text="Status: Could not read this playlist",
+                foreground="#D93025"
+            )
+            self.action_btn.config(text="Close", command=self.win.destroy)
+        elif batch.expanding:
+            self.status_label.config(text="Status: Finding videos…", foreground="#6A1B9A")
+        elif not batch.is_finished:
+            self.status_label.config(text="Status: Downloading", foreground="#1A73E8")
+        else:
+            self.progress.set(100)
+            self.status_label.config(text="Status: Completed", foreground="#188038")
+            self.action_btn.config(text="Close", command=self.win.destroy)
+
+    def cancel(self):
+        if self.batch:
+            self.batch.cancel()
+        self.status_label.config(text="Status: Cancelled", foreground="#D93025")
+        self.win.after(600, self.win.destroy)
@@ -0,0 +1,12 @@
+import os
+import sys
+import tempfile
+
+# app modules resolve ~/.pica when they are imported, point it at a
+# throwaway home before any test imports them
+HOME = tempfile.mkdtemp(prefix="pica-tests-")
+os.environ["HOME"] = HOME
+os.environ["USERPROFILE"] = HOME
+
+# the app imports its modules flat, from the downloader folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,21 @@
+import pytest
+
+from cli import parse_args
+from utils.stream_selection import QUALITY_PRESETS
+
+
+def test_quality_accepts_every_preset():
+    for preset in QUALITY_PRESETS:
+        assert parse_args(["-q", preset, "https://youtu.be/x"]).quality == preset
+
+
+def test_quality_defaults_to_best():
+    assert parse_args(["https://youtu.be/x"]).quality == "best"
+
+
+def test_quality_rejects_unknown_preset(capsys):
+    with pytest.raises(SystemExit) as exc:
+        parse_args(["-q", "4k", "https://youtu.be/x"])
+
+    assert exc.value.code == 2
+    assert "invalid choice" in capsys.readouterr().err
@@ -0,0 +1,93 @@
+import json
+import os
+
+import pytest
+
+from utils import library_manager
+
+
+ENTRIES = [
+    {"id": "aaaaaaaaaaa", "title": "First", "author": "A", "downloaded_at": "2024-01-01", "path": "/a.mp4"},
+    {"id": "bbbbbbbbbbb", "title": "Second", "author": "B", "downloaded_at": "2024-02-01", "path": "/b.mp4"},
+]
+
+
+@pytest.fixture
+def library(tmp_path, monkeypatch):
+    """
+    library_manager pointed at a fresh database and library.json.
+    """
+    json_path = str(tmp_path / "library.json")
+    monkeypatch.setattr(library_manager, "LIBRARY_DB", str(tmp_path / "library.db"))
+    monkeypatch.setattr(library_manager, "LIBRARY_JSON", json_path)
+    monkeypatch.setattr(library_manager, "LIBRARY_JSON_BACKUP", json_path + ".migrated")
+    monkeypatch.setattr(library_manager, "_conn", None)
+    monkeypatch.setattr(library_manager, "_cache", library_manager.LibraryCache())
+
+    yield library_manager
+
+    reconnect(library_manager)
+
+
+def reconnect(lm):
+    # what a restart of the app looks like to the module
+    if lm._conn is not None:
+        lm._conn.close()
+    lm._conn = None
+    lm._cache = lm.LibraryCache()
+
+
+def write_json(lm, entries):
+    with open(lm.LIBRARY_JSON, "w", encoding="utf-8") as f:
+        json.dump(entries, f)
+
+
+def test_json_is_imported_and_kept_as_backup(library):
+    write_json(library, ENTRIES)
+
+    assert library.get_library_count() == 2
+    assert library.get_library_entry("bbbbbbbbbbb")["title"] == "Second"
+    assert not os.path.exists(library.LIBRARY_JSON)
+    assert os.path.exists(library.LIBRARY_JSON_BACKUP)
+
+
+def test_import_runs_only_once(library):
+    write_json(library, ENTRIES)
+    assert library.get_library_count() == 2
+
+    library.remove_many_from_library(["aaaaaaaaaaa"])
+
+    # an older version writing library.json again is not re-imported
+    write_json(library, ENTRIES + [{"id": "ccccccccccc", "title": "Third"}])
+    reconnect(library)
+
+    assert library.get_library_ids() == {"bbbbbbbbbbb"}
+    assert os.path.exists(library.LIBRARY_JSON)
+
+
+def test_import_skips_entries_without_id_and_duplicates(library):
+    write_json(library, ENTRIES + [{"title": "No id"}, "junk", dict(ENTRIES[0], title="Dup")])
+
+    assert library.get_library_count() == 2
+    assert library.get_library_entry("aaaaaaaaaaa")["title"] == "First"
+
+
+def test_unreadable_json_starts_empty_and_is_kept(library):
+    with open(library.LIBRARY_JSON, "w", encoding="utf-8") as f:
+        f.write("[{broken")
+
+    assert library.get_library_count() == 0
+    assert os.path.exists(library.LIBRARY_JSON_BACKUP)
+
+
+def test_no_json_starts_empty(library):
+    assert library.load_library() == []
+    assert not os.path.exists(library.LIBRARY_JSON_BACKUP)
+
+
+def test_entries_survive_reconnect(library):
+    library.add_many_to_library(ENTRIES)
+    reconnect(library)
+
+    newest = library.load_library(newest_first=True)
+    assert [e.id for e in newest] == ["bbbbbbbbbbb", "aaaaaaaaaaa"]
@@ -0,0 +1,102 @@
+import os
+
+from utils.segmented_download import (
+    merge_intervals,
+    missing_ranges,
+    part_paths,
+    load_resume_state,
+    save_resume_state,
+)
+
+
+URL = "https://example.com/videoplayback?expire=2000000000&itag=18"
+
+
+# ----------------------------
+# Ranges
+# ----------------------------
+
+def test_missing_ranges_splits_into_segments():
+    assert missing_ranges(100, [], segment_size=30) == [
+        (0, 29), (30, 59), (60, 89), (90, 99)
+    ]
+
+
+def test_missing_ranges_skips_done_intervals():
+    done = [(0, 29), (60, 69)]
+    assert missing_ranges(100, done, segment_size=30) == [(30, 59), (70, 89), (90, 99)]
+
+
+def test_missing_ranges_handles_unsorted_overlapping_done():
+    done = [(50, 99), (0, 10), (5, 20)]
+    assert missing_ranges(100, done, segment_size=30) == [(21, 29), (30, 49)]
+
+
+def test_missing_ranges_cut_at_segment_multiples():
+    # resumed mid segment, later ranges start on segment boundaries
+    ranges = missing_ranges(100, [(0, 44)], segment_size=30)
+    assert ranges == [(45, 59), (60, 89), (90, 99)]
+    assert all(start % 30 == 0 for start, _ in ranges[1:])
+
+
+def test_missing_ranges_nothing_left():
+    assert missing_ranges(100, [(0, 99)]) == []
+
+
+def test_merge_intervals_joins_touching_ranges():
+    assert merge_intervals([(10, 19), (0, 9), (30, 39)]) == [(0, 19), (30, 39)]
+
+
+# ----------------------------
+# State record
+# ----------------------------
+
+def make_part(tmp_path, size=100):
+    part_path, state_path = part_paths(str(tmp_path / "abc.f18.mp4"))
+    with open(part_path, "wb") as f:
+        f.truncate(size)
+    return part_path, state_path
+
+
+def test_part_paths():
+    assert part_paths("x.mp4") == ("x.mp4.part", "x.mp4.part.json")
+
+
+def test_resume_state_round_trip(tmp_path):
+    part_path, state_path = make_part(tmp_path)
+    save_resume_state(state_path, "abc", 18, 100, [(40, 59), (0, 19), (20, 29)], URL)
+
+    assert load_resume_state(state_path, part_path, "abc", 18, 100) == [(0, 29), (40, 59)]
+    assert not os.path.exists(state_path + ".tmp")
+
+
+def test_resume_state_rejects_other_download(tmp_path):
+    part_path, state_path = make_part(tmp_path)
+    save_resume_state(state_path, "abc", 18, 100, [(0, 49)], URL)
+
+    assert load_resume_state(state_path, part_path, "other", 18, 100) == []
+    assert load_resume_state(state_path, part_path, "abc", 22, 100) == []
+    assert load_resume_state(state_path, part_path, "abc", 18, 200) == []
+
+
+def test_resume_state_rejects_wrong_part_size(tmp_path):
+    part_path, state_path = make_part(tmp_path, size=50)
+    save_resume_state(state_path, "abc", 18, 100, [(0, 49)], URL)
+
+    assert load_resume_state(state_path, part_path, "abc", 18, 100) == []
+
+
+def test_resume_state_without_part_or_record(tmp_path):
+    part_path, state_path = part_paths(str(tmp_path / "abc.f18.mp4"))
+    assert load_resume_state(state_path, part_path, "abc", 18, 100) == []
+
+    make_part(tmp_path)
+    assert load_resume_state(state_path, part_path, "abc", 18, 100) == []
+
+
+def test_resume_state_unreadable_record(tmp_path):
+    part_path, state_path = make_part(tmp_path)
+    with open(state_path, "w", encoding="utf-8") as f:
+        f.write("{not json")
+
+    assert load_resume_state(state_path, part_path, "abc", 18, 100) == []
@@ -0,0 +1,224 @@
+import os
+
+import pytest
+
+from utils import thumbnail_pack as tp
+
+
+@pytest.fixture
+def open_pack(tmp_path):
+    """
+    Returns a factory of ThumbnailPacks on one folder, like separate
+    processes sharing ~/.pica. All are closed afterwards.
+    """
+    packs = []
+
+    def make():
+        pack = tp.ThumbnailPack(str(tmp_path))
+        packs.append(pack)
+        return pack
+
+    yield make
+
+    for pack in packs:
+        pack.close()
+
+
+def pack_files(folder):
+    # generation files only, not the lock file
+    return sorted(
+        n for n in os.listdir(folder)
+        if n.startswith("thumbs.") and n != "thumbs.lock"
+    )
+
+
+# ----------------------------
+# Put / get / remove
+# ----------------------------
+
+def test_put_get_has(open_pack):
+    pack = open_pack()
+    assert pack.put("aaaaaaaaaaa", b"jpeg-a")
+
+    assert pack.get("aaaaaaaaaaa") == b"jpeg-a"
+    assert pack.has("aaaaaaaaaaa")
+    assert pack.get("bbbbbbbbbbb") is None
+    assert not pack.has("bbbbbbbbbbb")
+
+
+def test_rejects_bad_keys_and_empty_data(open_pack):
+    pack = open_pack()
+
+    assert not pack.put("x" * (tp.KEY_SIZE + 1), b"data")
+    assert not pack.put("", b"data")
+    assert not pack.put("aaaaaaaaaaa", b"")
+    assert pack.get("x" * (tp.KEY_SIZE + 1)) is None
+
+
+def test_replace_keeps_one_live_slot(open_pack):
+    pack = open_pack()
+    for i in range(5):
+        pack.put("aaaaaaaaaaa", b"v%d" % i)
+
+    assert pack.get("aaaaaaaaaaa") == b"v4"
+    assert tp.U32.unpack_from(pack.index, tp.COUNT_AT)[0] == 1
+    assert tp.U64.unpack_from(pack.index, tp.DEAD_AT)[0] > 0
+
+
+def test_remove_many(open_pack):
+    pack = open_pack()
+    for vid in ("aaaaaaaaaaa", "bbbbbbbbbbb", "ccccccccccc"):
+        pack.put(vid, vid.encode())
+
+    assert pack.remove_many(["aaaaaaaaaaa", "bbbbbbbbbbb", "zzzzzzzzzzz"]) == 2
+    assert pack.remove_many(["aaaaaaaaaaa"]) == 0
+
+    assert pack.get("aaaaaaaaaaa") is None
+    assert pack.get("ccccccccccc") == b"ccccccccccc"
+
+
+def test_other_instance_sees_writes(open_pack):
+    writer, reader = open_pack(), open_pack()
+    writer.put("aaaaaaaaaaa", b"first")
+    assert reader.get("aaaaaaaaaaa") == b"first"
+
+    # appended after the reader mapped the data file
+    writer.put("bbbbbbbbbbb", b"second" * 1000)
+    writer.remove_many(["aaaaaaaaaaa"])
+
+    assert reader.get("bbbbbbbbbbb") == b"second" * 1000
+    assert reader.get("aaaaaaaaaaa") is None
+
+
+# ----------------------------
+# Generations
+# ----------------------------
+
+def test_compact_switches_generation(open_pack, tmp_path):
+    pack, other = open_pack(), open_pack()
+    for i in range(20):
+        pack.put(f"video{i:06d}", b"x" * 1000)
+    other.get("video000000")
+
+    pack.remove_many([f"video{i:06d}" for i in range(15)])
+    size_before = pack.data_size()
+    pack.compact()
+
+    assert pack.generation == 2
+    assert pack.data_size() < size_before
+    assert pack_files(tmp_path) == ["thumbs.2.idx", "thumbs.2.pack"]
+
+    # the other instance notices the stale index and follows
+    assert other.get("video000019") == b"x" * 1000
+    assert other.get("video000000") is None
+    assert other.generation == 2
+
+
+def test_remove_compacts_once_enough_is_dead(open_pack, monkeypatch):
+    monkeypatch.setattr(tp, "COMPACT_MIN_DEAD", 0)
+    pack = open_pack()
+    for i in range(4):
+        pack.put(f"video{i:06d}", b"x" * 1000)
+
+    pack.remove_many(["video000000"])
+    assert pack.generation == 1
+
+    pack.remove_many(["video000001", "video000002"])
+    assert pack.generation == 2
+    assert pack.get("video000003") == b"x" * 1000
+
+
+def test_index_grows(open_pack, monkeypatch):
+    monkeypatch.setattr(tp, "INITIAL_CAPACITY", 8)
+    pack = open_pack()
+    for i in range(40):
+        pack.put(f"video{i:06d}", b"%d" % i)
+
+    assert pack.generation > 1
+    assert pack.capacity >= 64
+    assert all(pack.get(f"video{i:06d}") == b"%d" % i for i in range(40))
+
+
+# ----------------------------
+# Recovery
+# ----------------------------
+
+def corrupt_index(pack):
+    path = pack.path(pack.generation, "idx")
+    pack.close()
+    with open(path, "r+b") as f:
+        f.write(b"XXXX")
+
+
+def test_recovers_unreadable_index(open_pack):
+    pack = open_pack()
+    pack.put("aaaaaaaaaaa", b"old")
+    pack.put("aaaaaaaaaaa", b"new")
+    pack.put("bbbbbbbbbbb", b"b")
+    pack.put("ccccccccccc", b"c")
+    pack.remove_many(["ccccccccccc"])
+    corrupt_index(pack)
+
+    recovered = open_pack()
+    assert recovered.get("aaaaaaaaaaa") == b"new"
+    assert recovered.get("bbbbbbbbbbb") == b"b"
+    assert recovered.get("ccccccccccc") is None
+    assert recovered.generation == 2
+
+
+def test_recovery_ignores_record_cut_short(open_pack):
+    pack = open_pack()
+    pack.put("aaaaaaaaaaa", b"kept")
+    data_path = pack.path(pack.generation, "pack")
+    corrupt_index(pack)
+
+    # a crash in the middle of an append
+    with open(data_path, "ab") as f:
+        f.write(tp.RECORD.pack(tp.encode_key("bbbbbbbbbbb"), 100) + b"short")
+
+    recovered = open_pack()
+    assert recovered.get("aaaaaaaaaaa") == b"kept"
+    assert recovered.get("bbbbbbbbbbb") is None
+
+
+# ----------------------------
+# Legacy thumbnails
+# ----------------------------
+
+def test_imports_legacy_files_once(open_pack, tmp_path):
+    legacy = tmp_path / tp.LEGACY_THUMBS_DIR
+    resized = tmp_path / tp.LEGACY_RESIZED_DIR
+    legacy.mkdir()
+    resized.mkdir(parents=True)
+    (legacy / "aaaaaaaaaaa.jpg").write_bytes(b"legacy-a")
+    (legacy / "notes.txt").write_bytes(b"ignored")
+    (resized / "0123abcd.jpg").write_bytes(b"resized")
+
+    pack = open_pack()
+    assert pack.get("aaaaaaaaaaa") == b"legacy-a"
+    # only what was packed is removed, the folder stays for the rest
+    assert sorted(p.name for p in legacy.iterdir()) == ["notes.txt"]
+    assert not resized.exists()
+    assert pack_files(tmp_path) == ["thumbs.1.idx", "thumbs.1.pack"]
+
+
+def test_legacy_import_removes_emptied_folder(open_pack, tmp_path):
+    legacy = tmp_path / tp.LEGACY_THUMBS_DIR
+    legacy.mkdir()
+    (legacy / "aaaaaaaaaaa.jpg").write_bytes(b"legacy-a")
+    (legacy / "bbbbbbbbbbb.jpg").write_bytes(b"legacy-b")
+
+    pack = open_pack()
+    assert pack.get("bbbbbbbbbbb") == b"legacy-b"
+    assert not legacy.exists()
+
+
+def test_legacy_import_keeps_files_it_could_not_pack(open_pack, tmp_path):
+    legacy = tmp_path / tp.LEGACY_THUMBS_DIR
+    legacy.mkdir()
+    (legacy / "aaaaaaaaaaa.jpg").write_bytes(b"legacy-a")
+    (legacy / "bbbbbbbbbbb.jpg").write_bytes(b"")
+
+    pack = open_pack()
+    assert pack.get("bbbbbbbbbbb") is None
+    assert sorted(p.name for p in legacy.iterdir()) == ["bbbbbbbbbbb.jpg"]
@@ -0,0 +1,96 @@
+import queue
+import threading
+import time
+
+from utils.ui_bus import UIBus
+
+
+class FakeTk:
+    """
+    Runs after() callbacks on its own thread, like threaded Tcl: an
+    after() from another thread blocks until the Tk thread takes it.
+    """
+
+    CROSS_THREAD_WAIT = 10
+
+    def __init__(self):
+        self.requests = queue.Queue()
+        self.timers = []
+        self.running = True
+        self.thread = threading.Thread(target=self.loop, daemon=True)
+        self.thread.start()
+
+    def after(self, delay, callback):
+        due = time.time() + delay / 1000
+        if threading.current_thread() is self.thread:
+            self.timers.append((due, callback))
+            return
+
+        taken = threading.Event()
+        self.requests.put((due, callback, taken))
+        if not taken.wait(self.CROSS_THREAD_WAIT):
+            raise RuntimeError("Tk thread never serviced after()")
+
+    def loop(self):
+        while self.running:
+            try:
+                due, callback, taken = self.requests.get(timeout=0.005)
+                self.timers.append((due, callback))
+                taken.set()
+            except queue.Empty:
+                pass
+
+            now = time.time()
+            ready = [t for t in self.timers if t[0] <= now]
+            self.timers = [t for t in self.timers if t[0] > now]
+            for _, callback in ready:
+                callback()
+
+    def stop(self):
+        self.running = False
+        self.thread.join()
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_posts_with_same_key_are_merged():
+    root = FakeTk()
+    bus = UIBus(fps=10)
+    ran = []
+    try:
+        for i in range(100):
+            bus.post("progress", ran.append, i)
+        bus.attach(root)
+
+        assert wait_for(lambda: ran)
+        time.sleep(0.2)
+        assert ran == [99]
+    finally:
+        root.stop()
+
+
+def test_post_from_worker_during_drain_does_not_block():
+    root = FakeTk()
+    bus = UIBus(fps=1000)
+    bus.attach(root)
+    ran = []
+
+    def slow_callback():
+        # a worker posts while this drain is still running callbacks
+        worker = threading.Thread(target=bus.post, args=("b", ran.append, "b"))
+        worker.start()
+        time.sleep(0.1)
+        ran.append("a")
+
+    try:
+        bus.post("a", slow_callback)
+        assert wait_for(lambda: ran == ["a", "b"])
+    finally:
+        root.stop()
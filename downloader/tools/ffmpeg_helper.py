@@ -1,25 +1,301 @@
 import subprocess
 import os
+import shutil
 import sys
+import socket
+import threading
 from utils.resource_path import resource_path
 
 
-def merge_audio_video(video_path, audio_path, output_path):
-    ffmpeg =  resource_path("tools/ffmpeg/ffmpeg.exe")
+# bytes handed to ffmpeg per socket write while streaming
+FEED_CHUNK_SIZE = 1024 * 1024
+
+# how often blocked feeders re-check for abort / ffmpeg exit
+POLL_INTERVAL = 0.5
+
+
+# no console window for ffmpeg on Windows, 0 elsewhere
+CREATE_NO_WINDOW = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+
+
+def ffmpeg_path():
+    bundled = resource_path("tools/ffmpeg/ffmpeg.exe")
+    if os.path.exists(bundled):
+        return bundled
+
+    # headless / non-Windows installs use the system ffmpeg
+    return shutil.which("ffmpeg") or bundled
+
+
+def parse_progress(lines, duration, on_progress):
+    """
+    Reads ffmpeg "-progress" key=value lines and reports
+    on_progress(percent, speed, eta) once per progress block.
+    speed is x realtime, eta is seconds (None while unknown).
+    """
+    out_time = 0.0
+    speed = 0.0
+
+    for line in lines:
+        key, _, value = line.strip().partition("=")
+
+        if key == "out_time_us":
+            try:
+                out_time = max(0.0, int(value) / 1_000_000)
+            except ValueError:
+                pass
+        elif key == "speed":
+            try:
+                speed = float(value.rstrip("x"))
+            except ValueError:
+                speed = 0.0
+        elif key == "progress":
+            if not on_progress:
+                continue
+
+            if value == "end":
+                on_progress(100, speed, 0)
+                continue
+
+            percent = 0
+            eta = None
+            if duration:
+                percent = min(99, int(out_time / duration * 100))
+                if speed > 0:
+                    eta = max(0.0, (duration - out_time) / speed)
+
+            on_progress(percent, speed, eta)
+
+
+def merge_audio_video(video_path, audio_path, output_path,
+                      duration=None, on_progress=None):
+    """
+    Merges the tracks without re-encoding. duration (seconds) lets
+    on_progress(percent, speed, eta) report real merge progress.
+    """
+    ffmpeg = ffmpeg_path()
 
     cmd = [
         ffmpeg,
         "-y",
+        "-nostdin",
+        "-progress", "pipe:1",
+        "-nostats",
         "-i", video_path,
         "-i", audio_path,
         "-c", "copy",
         output_path
     ]
 
-    subprocess.run(
+    process = subprocess.Popen(
         cmd,
-        stdout=subprocess.DEVNULL,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
         stderr=subprocess.DEVNULL,
-        check = True,
-        creationflags=subprocess.CREATE_NO_WINDOW
+        text=True,
+        creationflags=CREATE_NO_WINDOW
     )
+
+    with process.stdout:
+        parse_progress(process.stdout, duration, on_progress)
+
+    if process.wait() != 0:
+        raise subprocess.CalledProcessError(process.returncode, cmd)
+
+
+# ----------------------------
+# Streaming merge
+# ----------------------------
+
+class TrackFeeder:
+    """
+    Serves one growing track file to ffmpeg over a localhost socket.
+    Only bytes reported as contiguous from offset 0 are sent.
+    """
+
+    def __init__(self, path, total_size):
+        self.path = path
+        self.part_path = path + ".part"
+        self.total_size = total_size
+        self.available = 0
+        self.error = None
+        self.aborted = False
+        self.cond = threading.Condition()
+
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.bind(("127.0.0.1", 0))
+        self.server.listen(1)
+        self.server.settimeout(POLL_INTERVAL)
+
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    @property
+    def url(self):
+        return f"tcp://127.0.0.1:{self.server.getsockname()[1]}"
+
+    def update(self, contiguous):
+        with self.cond:
+            self.available = max(self.available, contiguous)
+            self.cond.notify_all()
+
+    def abort(self):
+        with self.cond:
+            self.aborted = True
+            self.cond.notify_all()
+        try:
+            self.server.close()
+        except Exception:
+            pass
+
+    def read(self, pos, size):
+        # the .part file is renamed once the track is complete,
+        # open per read so the rename is never blocked for long
+        path = self.part_path if os.path.exists(self.part_path) else self.path
+        with open(path, "rb") as f:
+            f.seek(pos)
+            return f.read(size)
+
+    def accept(self):
+        # ffmpeg opens inputs one by one, so this can take a while
+        while not self.aborted:
+            try:
+                conn, _ = self.server.accept()
+                conn.settimeout(None)
+                return conn
+            except socket.timeout:
+                continue
+        return None
+
+    def run(self):
+        conn = None
+        try:
+            conn = self.accept()
+            if not conn:
+                return
+            pos = 0
+
+            while pos < self.total_size:
+                with self.cond:
+                    while self.available <= pos and not self.aborted:
+                        self.cond.wait()
+                    if self.aborted:
+                        return
+                    end = self.available
+
+                while pos < end:
+                    data = self.read(pos, min(FEED_CHUNK_SIZE, end - pos))
+                    if not data:
+                        raise IOError("Track file is shorter than reported")
+                    conn.sendall(data)
+                    pos += len(data)
+        except Exception as e:
+            if not self.aborted:
+                self.error = e
+        finally:
+            if conn:
+                conn.close()
+            self.server.close()
+
+
+class StreamingMerge:
+    """
+    Muxes video and audio with ffmpeg while both are still downloading,
+    so the output is ready right after the last byte arrives.
+
+    Call feeder(i).update(contiguous_bytes) as track i grows, then
+    finish() once every track is complete. Tracks are fragmented MP4
+    (YouTube DASH), which ffmpeg can read front to back.
+    """
+
+    def __init__(self, tracks, output_path, duration=None, on_progress=None):
+        # tracks: [(path, total_size), ...] in ffmpeg input order
+        self.output_path = output_path
+        self.feeders = [TrackFeeder(path, size) for path, size in tracks]
+        self.duration = duration
+        self.on_progress = on_progress
+        self.process = None
+        self.progress_thread = None
+
+    def start(self):
+        cmd = [
+            ffmpeg_path(), "-y", "-nostdin",
+            "-progress", "pipe:1", "-nostats"
+        ]
+        for feeder in self.feeders:
+            cmd += ["-i", feeder.url]
+        cmd += [
+            "-map", "0:v:0",
+            "-map", "1:a:0",
+            "-c", "copy",
+            self.output_path
+        ]
+
+        for feeder in self.feeders:
+            feeder.thread.start()
+
+        try:
+            self.process = subprocess.Popen(
+                cmd,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+                creationflags=CREATE_NO_WINDOW
+            )
+        except Exception:
+            self.abort()
+            raise
+
+        self.progress_thread = threading.Thread(
+            target=self.read_progress,
+            daemon=True
+        )
+        self.progress_thread.start()
+
+    def read_progress(self):
+        with self.process.stdout:
+            parse_progress(self.process.stdout, self.duration, self.on_progress)
+
+    def feeder(self, index):
+        return self.feeders[index]
+
+    def finish(self):
+        for feeder in self.feeders:
+            while feeder.thread.is_alive():
+                if self.process.poll() is not None:
+                    # ffmpeg gave up, nobody will read the rest
+                    for f in self.feeders:
+                        f.abort()
+                feeder.thread.join(POLL_INTERVAL)
+
+        errors = [f.error for f in self.feeders if f.error]
+        if errors:
+            self.abort()
+            raise errors[0]
+
+        self.progress_thread.join()
+        if self.process.wait() != 0:
+            self.remove_output()
+            raise subprocess.CalledProcessError(self.process.returncode, "ffmpeg")
+
+        return self.output_path
+
+    def abort(self):
+        for feeder in self.feeders:
+            feeder.abort()
+
+        if self.process and self.process.poll() is None:
+            try:
+                self.process.kill()
+                self.process.wait()
+            except Exception:
+                pass
+
+        self.remove_output()
+
+    def remove_output(self):
+        try:
+            if os.path.exists(self.output_path):
+                os.remove(self.output_path)
+        except Exception:
+            pass
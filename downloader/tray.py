@@ -3,6 +3,19 @@ import pystray
 from pystray import MenuItem as item
 from PIL import Image
 from utils.resource_path import resource_path
+from utils.rate_limiter import global_limiter, set_global_limit
+from utils.save_settings import save_bandwidth_limit
+
+
+# (menu label, bytes per second), 0 = unlimited
+SPEED_LIMITS = (
+    ("Unlimited", 0),
+    ("512 KB/s", 512 * 1024),
+    ("1 MB/s", 1024 ** 2),
+    ("2 MB/s", 2 * 1024 ** 2),
+    ("5 MB/s", 5 * 1024 ** 2),
+    ("10 MB/s", 10 * 1024 ** 2),
+)
 
 
 class SystemTray:
@@ -16,6 +29,7 @@ class SystemTray:
         menu = (
             item("Open Pica", self.show_app),
             item("Library", self.open_library),
+            item("Speed Limit", self.speed_limit_menu()),
             item("Exit", self.exit_app),
         )
 
@@ -28,6 +42,22 @@ class SystemTray:
 
         threading.Thread(target=self.icon.run, daemon=True).start()
 
+    def speed_limit_menu(self):
+        def setter(limit):
+            return lambda: self.set_speed_limit(limit)
+
+        def checked(limit):
+            return lambda _item: global_limiter.rate == limit
+
+        return pystray.Menu(*(
+            item(label, setter(limit), checked=checked(limit), radio=True)
+            for label, limit in SPEED_LIMITS
+        ))
+
+    def set_speed_limit(self, limit):
+        set_global_limit(limit)
+        save_bandwidth_limit(limit)
+
     def show_app(self):
         self.root.after(0, self.root.deiconify)
         self.root.after(0, self.root.lift)
@@ -1,5 +1,4 @@
 import os
-from tkinter import messagebox
 
 def safe_filename(name):
     invalid = '<>:"/\\|?*'
@@ -25,6 +24,9 @@ def confirm_existing_file(folder, filename, parent=None):
     if not os.path.exists(path):
         return True  # safe to proceed
 
+    # imported here so headless code can use the helpers above
+    from tkinter import messagebox
+
     return messagebox.askyesno(
         "File Already Exists",
         "This file already exists.\nDo you want to download it again?",
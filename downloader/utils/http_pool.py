@@ -0,0 +1,101 @@
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+
+# ----------------------------
+# Config
+# ----------------------------
+
+# distinct hosts kept alive (googlevideo edges, i.ytimg.com, ...)
+POOL_HOSTS = 32
+
+# connections per host, a hard cap: once all are busy, requests
+# wait for one to come back instead of opening throwaway ones.
+# Enough for every range worker of three adaptive jobs on one edge.
+POOL_PER_HOST = 24
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0",
+    "accept-language": "en-US,en",
+}
+
+
+class PooledAdapter(HTTPAdapter):
+    """
+    HTTPAdapter that remembers counters of host pools it drops,
+    so statistics survive LRU eviction.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.retired = {"requests": 0, "connections": 0}
+        super().__init__(*args, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+
+        pools = self.poolmanager.pools
+        dispose = pools.dispose_func
+
+        def retire(pool):
+            self.retired["requests"] += pool.num_requests
+            self.retired["connections"] += pool.num_connections
+            if dispose:
+                dispose(pool)
+
+        pools.dispose_func = retire
+
+    def counters(self):
+        pools = self.poolmanager.pools
+        total = dict(self.retired)
+
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            total["requests"] += pool.num_requests
+            total["connections"] += pool.num_connections
+
+        total["hosts"] = len(pools)
+        return total
+
+
+_lock = threading.Lock()
+_session = None
+_adapter = None
+
+
+def get_session():
+    """
+    Returns the process-wide keep-alive session. Stream ranges,
+    thumbnails and any other HTTP calls share its connections.
+    """
+    global _session, _adapter
+
+    with _lock:
+        if _session is None:
+            _adapter = PooledAdapter(
+                pool_connections=POOL_HOSTS,
+                pool_maxsize=POOL_PER_HOST,
+                pool_block=True
+            )
+            _session = requests.Session()
+            _session.headers.update(HEADERS)
+            _session.mount("https://", _adapter)
+            _session.mount("http://", _adapter)
+
+        return _session
+
+
+def pool_stats():
+    """
+    Returns connection reuse statistics of the shared pool:
+    requests, connections (new TCP/TLS handshakes), hits (requests on
+    a reused connection), misses and hosts currently pooled.
+    """
+    get_session()
+    total = _adapter.counters()
+
+    total["misses"] = total["connections"]
+    total["hits"] = max(0, total["requests"] - total["connections"])
+    return total
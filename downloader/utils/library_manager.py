@@ -1,77 +1,367 @@
 import json
 import os
-import requests
+import sqlite3
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 from utils.app_paths import app_data_path, app_data_dir
+from utils.http_pool import get_session
+from utils.thumbnail_pack import thumbnail_pack
 
 
 # ----------------------------
 # Paths
 # ----------------------------
 
+LIBRARY_DB = app_data_path("library.db")
+
+# old store, imported into LIBRARY_DB once and kept as a backup
 LIBRARY_JSON = app_data_path("library.json")
-THUMBS_DIR = os.path.join(app_data_dir(), "thumbs")
+LIBRARY_JSON_BACKUP = LIBRARY_JSON + ".migrated"
+
+# bumped when the schema changes
+SCHEMA_VERSION = 1
+
+COLUMNS = ("id", "title", "author", "publish_date", "downloaded_at", "thumbnail", "path")
+
+INSERT_ENTRY = (
+    f"INSERT OR IGNORE INTO library ({', '.join(COLUMNS)}) "
+    f"VALUES ({', '.join('?' * len(COLUMNS))})"
+)
 
 
 def ensure_dirs():
     os.makedirs(app_data_dir(), exist_ok=True)
-    os.makedirs(THUMBS_DIR, exist_ok=True)
 
 
 # ----------------------------
-# Library read / write
+# Database
 # ----------------------------
 
-def load_library():
+_lock = threading.RLock()
+_conn = None
+
+
+def get_connection():
+    """
+    Returns the shared connection, creating the schema and importing
+    library.json on first use. WAL lets the app and the CLI read
+    while the other one writes.
+    """
+    global _conn
+
+    with _lock:
+        if _conn is None:
+            ensure_dirs()
+            conn = sqlite3.connect(
+                LIBRARY_DB,
+                timeout=10,
+                isolation_level=None,      # transactions are explicit
+                check_same_thread=False    # guarded by _lock
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            migrate(conn)
+            _conn = conn
+
+        return _conn
+
+
+@contextmanager
+def transaction():
+    """
+    One atomic write: everything inside commits together or not at all.
+    """
+    with _lock:
+        conn = get_connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        _cache.invalidate()
+
+
+def migrate(conn):
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # another process may have migrated while we waited
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version < 1:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS library (
+                    id TEXT PRIMARY KEY,
+                    title TEXT NOT NULL DEFAULT '',
+                    author TEXT NOT NULL DEFAULT '',
+                    publish_date TEXT NOT NULL DEFAULT '',
+                    downloaded_at TEXT NOT NULL DEFAULT '',
+                    thumbnail TEXT NOT NULL DEFAULT '',
+                    path TEXT NOT NULL DEFAULT ''
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS library_author ON library(author)")
+            conn.execute("CREATE INDEX IF NOT EXISTS library_downloaded_at ON library(downloaded_at)")
+
+            import_json(conn)
+            conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+    # renamed only after the import is committed
+    if os.path.exists(LIBRARY_JSON) and not os.path.exists(LIBRARY_JSON_BACKUP):
+        try:
+            os.replace(LIBRARY_JSON, LIBRARY_JSON_BACKUP)
+        except OSError:
+            pass
+
+
+def import_json(conn):
     if not os.path.exists(LIBRARY_JSON):
-        return []
+        return
 
     try:
         with open(LIBRARY_JSON, "r", encoding="utf-8") as f:
-            return json.load(f)
+            entries = json.load(f)
+    except Exception:
+        return   # unreadable, nothing to keep
+
+    conn.executemany(
+        INSERT_ENTRY,
+        (entry_row(e) for e in entries if isinstance(e, dict) and e.get("id"))
+    )
+
+
+def entry_row(entry):
+    return tuple(str(entry.get(column) or "") for column in COLUMNS)
+
+
+# ----------------------------
+# In-memory cache
+# ----------------------------
+
+class LibraryEntry:
+    """
+    One library row. Reads like a dict (entry["path"], entry.get(...))
+    so callers written against the JSON store keep working.
+    """
+
+    __slots__ = COLUMNS
+
+    def __init__(self, row):
+        for column, value in zip(COLUMNS, row):
+            setattr(self, column, value)
+
+    def __getitem__(self, key):
+        if key not in COLUMNS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        if key not in COLUMNS:
+            return default
+        return getattr(self, key) or default
+
+    def to_dict(self):
+        return {column: getattr(self, column) for column in COLUMNS}
+
+
+class LibraryCache:
+    """
+    Process-wide copy of the library with precomputed lookups.
+
+    Reloaded when another process commits to the database (sqlite
+    data_version changes) or after a write from this process.
+    """
+
+    def __init__(self):
+        self.valid = False
+        self.data_version = None
+        self.entries = []          # insertion order
+        self.by_id = {}
+        self._newest = None        # built on first use
+        self._by_author = None
+
+    def invalidate(self):
+        with _lock:
+            self.valid = False
+
+    def refresh(self):
+        # caller holds _lock
+        conn = get_connection()
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if self.valid and version == self.data_version:
+            return
+
+        rows = conn.execute(
+            f"SELECT {', '.join(COLUMNS)} FROM library ORDER BY rowid"
+        ).fetchall()
+
+        self.entries = [LibraryEntry(row) for row in rows]
+        self.by_id = {e.id: e for e in self.entries}
+        self._newest = None
+        self._by_author = None
+        self.data_version = version
+        self.valid = True
+
+    def newest(self):
+        # caller holds _lock
+        if self._newest is None:
+            self._newest = sorted(
+                self.entries,
+                key=lambda e: e.downloaded_at,
+                reverse=True
+            )
+        return self._newest
+
+    def by_author(self):
+        # caller holds _lock, authors ordered by their newest download
+        if self._by_author is None:
+            groups = {}
+            for e in self.newest():
+                groups.setdefault(e.author or "Unknown", []).append(e)
+            self._by_author = groups
+        return self._by_author
+
+
+_cache = LibraryCache()
+
+
+@contextmanager
+def cached():
+    with _lock:
+        _cache.refresh()
+        yield _cache
+
+
+# ----------------------------
+# Library read / write
+# ----------------------------
+
+def load_library(newest_first=False):
+    """
+    Returns every entry, in insertion order or newest download first.
+    """
+    try:
+        with cached() as cache:
+            return list(cache.newest() if newest_first else cache.entries)
     except Exception:
         return []
 
 
+def library_by_author():
+    """
+    Returns {author: [entries newest first]}, authors ordered by
+    their most recent download.
+    """
+    try:
+        with cached() as cache:
+            return {a: list(items) for a, items in cache.by_author().items()}
+    except Exception:
+        return {}
+
+
 def save_library(entries):
-    with open(LIBRARY_JSON, "w", encoding="utf-8") as f:
-        json.dump(entries, f, indent=2)
+    """
+    Replaces the whole library with entries.
+    """
+    with transaction() as conn:
+        conn.execute("DELETE FROM library")
+        conn.executemany(
+            INSERT_ENTRY,
+            (entry_row(e) for e in entries if e.get("id"))
+        )
 
 
 def get_library_count():
     try:
-        return len(load_library())
+        with cached() as cache:
+            return len(cache.by_id)
     except Exception:
         return 0
 
 
+def get_library_entry(video_id):
+    try:
+        with cached() as cache:
+            return cache.by_id.get(video_id)
+    except Exception:
+        return None
+
+
+def find_downloaded(video_id):
+    """
+    Returns the library entry of video_id if its file is still on
+    disk, None otherwise. Local files only.
+    """
+    if not video_id:
+        return None
+
+    entry = get_library_entry(video_id)
+    if entry and entry["path"] and os.path.exists(entry["path"]):
+        return entry
+    return None
+
+
+def get_library_ids():
+    """
+    Returns the set of video ids already in the library.
+    """
+    try:
+        with cached() as cache:
+            return set(cache.by_id)
+    except Exception:
+        return set()
+
+
 # ----------------------------
 # Remove entry
 # ----------------------------
 
 def remove_from_library(video_id):
-    entries = load_library()
+    remove_many_from_library([video_id])
+    return load_library()
 
-    updated = []
-    removed_item = None
 
-    for e in entries:
-        if e.get("id") == video_id:
-            removed_item = e
-        else:
-            updated.append(e)
+def remove_many_from_library(video_ids):
+    """
+    Removes every id in one commit. Returns how many were removed.
+    """
+    removed = [e for e in map(get_library_entry, set(video_ids)) if e]
+    if not removed:
+        return 0
+
+    with transaction() as conn:
+        conn.executemany(
+            "DELETE FROM library WHERE id = ?",
+            ((e.id,) for e in removed)
+        )
+
+    # thumbnails go once the rows are gone for good
+    try:
+        thumbnail_pack.remove_many(e.id for e in removed)
+    except Exception:
+        pass
+
+    return len(removed)
 
-    if removed_item:
-        thumb = removed_item.get("thumbnail")
-        if thumb and os.path.exists(thumb):
-            try:
-                os.remove(thumb)
-            except Exception:
-                pass
 
-        save_library(updated)
+def update_library_paths(paths):
+    """
+    Points entries at moved files, paths is {video_id: new_path}.
+    One commit for all of them.
+    """
+    if not paths:
+        return
 
-    return updated
+    with transaction() as conn:
+        conn.executemany(
+            "UPDATE library SET path = ? WHERE id = ?",
+            ((path, video_id) for video_id, path in paths.items())
+        )
 
 
 # ----------------------------
@@ -79,22 +369,22 @@ def remove_from_library(video_id):
 # ----------------------------
 
 def download_thumbnail(url, video_id):
-    ensure_dirs()
-
-    thumb_path = os.path.join(THUMBS_DIR, f"{video_id}.jpg")
-
-    if os.path.exists(thumb_path):
-        return thumb_path
+    """
+    Stores the thumbnail of video_id in the thumbnail pack. Returns
+    url, kept in the entry as where it came from, or "" on failure.
+    """
+    if thumbnail_pack.has(video_id):
+        return url
 
     try:
-        r = requests.get(url, timeout=10)
+        r = get_session().get(url, timeout=10)
         r.raise_for_status()
-        with open(thumb_path, "wb") as f:
-            f.write(r.content)
+        if not thumbnail_pack.put(video_id, r.content):
+            return ""
     except Exception:
         return ""
 
-    return thumb_path
+    return url
 
 
 # ----------------------------
@@ -104,14 +394,15 @@ def download_thumbnail(url, video_id):
 def add_to_library(yt, video_path):
     ensure_dirs()
 
-    entries = load_library()
-
-    # avoid duplicates
-    for e in entries:
-        if e.get("id") == yt.video_id:
-            return
+    # avoid duplicates, but a video downloaded again after its file
+    # was deleted must point at the new file or it is never found
+    existing = get_library_entry(yt.video_id)
+    if existing:
+        if not (existing.path and os.path.exists(existing.path)):
+            update_library_paths({yt.video_id: video_path})
+        return
 
-    thumb_path = download_thumbnail(
+    thumbnail = download_thumbnail(
         yt.thumbnail_url,
         yt.video_id
     )
@@ -126,9 +417,24 @@ def add_to_library(yt, video_path):
         "author": yt.author or "Unknown",
         "publish_date": publish_date,
         "downloaded_at": datetime.now().isoformat(),
-        "thumbnail": thumb_path,
+        "thumbnail": thumbnail,
         "path": video_path
     }
 
-    entries.append(entry)
-    save_library(entries)
+    add_many_to_library([entry])
+
+
+def add_many_to_library(entries):
+    """
+    Adds entries (dicts with the library columns) in one commit,
+    ids already in the library are left as they are.
+    Returns how many were added.
+    """
+    rows = [entry_row(e) for e in entries if e.get("id")]
+    if not rows:
+        return 0
+
+    with transaction() as conn:
+        before = conn.total_changes
+        conn.executemany(INSERT_ENTRY, rows)
+        return conn.total_changes - before
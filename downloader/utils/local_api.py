@@ -0,0 +1,150 @@
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# ----------------------------
+# Config
+# ----------------------------
+
+# fixed so the browser extension knows where to find the app
+API_HOST = "127.0.0.1"
+API_PORT = 47653
+
+# request bodies are a url and a preset, anything bigger is refused
+MAX_BODY_SIZE = 16 * 1024
+
+# only the extension may call from a browser, web pages may not
+ALLOWED_ORIGIN_PREFIXES = ("chrome-extension://", "moz-extension://")
+
+ALLOWED_HOSTS = ("127.0.0.1", "localhost")
+
+
+class APIHandler(BaseHTTPRequestHandler):
+    """
+    POST /download  {"url": "...", "quality": "720p"}  -> 202
+    GET  /ping                                         -> 200
+    """
+
+    server_version = "Pica"
+
+    def log_message(self, format, *args):
+        pass   # stay silent, no console in the packaged app
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def is_allowed(self):
+        # a browser always sends Origin on cross-site posts, so pages
+        # other than the extension are refused. The Host check blocks
+        # DNS rebinding onto 127.0.0.1.
+        host = (self.headers.get("Host") or "").rsplit(":", 1)[0]
+        if host not in ALLOWED_HOSTS:
+            return False
+
+        origin = self.headers.get("Origin")
+        return not origin or origin.startswith(ALLOWED_ORIGIN_PREFIXES)
+
+    def read_json(self):
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            return None
+        if length <= 0 or length > MAX_BODY_SIZE:
+            return None
+
+        try:
+            data = json.loads(self.rfile.read(length).decode("utf-8"))
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+
+    def do_GET(self):
+        if not self.is_allowed():
+            self.send_json(403, {"ok": False, "error": "forbidden"})
+        elif self.path == "/ping":
+            self.send_json(200, {"ok": True, "app": "pica"})
+        else:
+            self.send_json(404, {"ok": False, "error": "not found"})
+
+    def do_POST(self):
+        if not self.is_allowed():
+            self.send_json(403, {"ok": False, "error": "forbidden"})
+            return
+
+        if self.path != "/download":
+            self.send_json(404, {"ok": False, "error": "not found"})
+            return
+
+        data = self.read_json()
+        url = data.get("url") if data else None
+        if not isinstance(url, str) or not url.strip():
+            self.send_json(400, {"ok": False, "error": "url missing"})
+            return
+
+        quality = data.get("quality")
+        if not isinstance(quality, str):
+            quality = None
+
+        try:
+            accepted = self.server.on_download(url.strip(), quality)
+        except Exception:
+            accepted = False
+
+        if accepted:
+            self.send_json(202, {"ok": True})
+        else:
+            self.send_json(400, {"ok": False, "error": "invalid url"})
+
+
+class APIServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    # on Windows SO_REUSEADDR would let two apps share the port
+    allow_reuse_address = os.name != "nt"
+
+
+class LocalAPI:
+    """
+    Localhost endpoint the browser extension hands videos to.
+
+    on_download(url, quality) is called on a server thread and
+    returns True when the url was accepted.
+    """
+
+    def __init__(self, on_download, host=API_HOST, port=API_PORT):
+        self.on_download = on_download
+        self.host = host
+        self.port = port
+        self.server = None
+
+    def start(self):
+        """
+        Starts serving in the background. Returns False if the port
+        can't be bound, the clipboard handoff still works then.
+        """
+        try:
+            self.server = APIServer((self.host, self.port), APIHandler)
+        except OSError:
+            self.server = None
+            return False
+
+        self.server.on_download = self.on_download
+
+        threading.Thread(
+            target=self.server.serve_forever,
+            daemon=True
+        ).start()
+        return True
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
@@ -0,0 +1,186 @@
+import json
+import os
+import time
+from datetime import datetime
+from utils.app_paths import app_cache_dir
+from utils.segmented_download import url_expiry, EXPIRY_MARGIN
+
+
+# ----------------------------
+# Config
+# ----------------------------
+
+MANIFEST_DIR = app_cache_dir("manifests")
+
+# oldest-used manifests are dropped above this count
+MAX_MANIFESTS = 500
+
+# stale manifests are still served for instant UI, up to this age
+MAX_STALE_AGE = 30 * 24 * 3600
+
+
+# ----------------------------
+# Cached records
+# ----------------------------
+
+class CachedStream:
+    """
+    The parts of a pytubefix Stream that downloads need.
+    """
+
+    def __init__(self, data):
+        self.itag = data["itag"]
+        self.url = data["url"]
+        self.filesize = data["filesize"]
+        self.filesize_approx = data.get("filesize_approx") or self.filesize
+        self.type = data["type"]
+        self.is_progressive = data["is_progressive"]
+        self.resolution = data.get("resolution")
+
+
+class CachedVideo:
+    """
+    The parts of a pytubefix YouTube object that the UI,
+    downloads and library need.
+    """
+
+    def __init__(self, data):
+        self.video_id = data["video_id"]
+        self.title = data["title"]
+        self.author = data["author"]
+        self.thumbnail_url = data["thumbnail_url"]
+        self.length = data.get("length") or 0
+        self.watch_url = f"https://www.youtube.com/watch?v={self.video_id}"
+
+        self.publish_date = None
+        if data.get("publish_date"):
+            try:
+                self.publish_date = datetime.strptime(data["publish_date"], "%Y-%m-%d")
+            except ValueError:
+                pass
+
+
+# ----------------------------
+# Helpers
+# ----------------------------
+
+def manifest_path(video_id):
+    return os.path.join(MANIFEST_DIR, f"{video_id}.json")
+
+
+def is_fresh(manifest):
+    """
+    True while the signed stream urls in the manifest are still valid.
+    """
+    return manifest.get("expires", 0) - EXPIRY_MARGIN > time.time()
+
+
+def stream_record(stream):
+    return {
+        "itag": stream.itag,
+        "url": stream.url,
+        "filesize": stream.filesize,
+        "filesize_approx": stream.filesize_approx,
+        "type": stream.type,
+        "is_progressive": stream.is_progressive,
+        "resolution": getattr(stream, "resolution", None),
+    }
+
+
+# ----------------------------
+# Read / write
+# ----------------------------
+
+def save_manifest(yt, options, audio):
+    """
+    Stores title, quality list and stream urls of a resolved video.
+    """
+    try:
+        streams = [stream for _, stream in options]
+        if audio and audio not in streams:
+            streams.append(audio)
+
+        records = [stream_record(stream) for stream in streams]
+        if not all(r["filesize"] for r in records):
+            return   # sizes unknown, cached streams would not be downloadable
+
+        expiries = [url_expiry(r["url"]) for r in records]
+
+        publish_date = ""
+        if yt.publish_date:
+            publish_date = yt.publish_date.strftime("%Y-%m-%d")
+
+        manifest = {
+            "video_id": yt.video_id,
+            "title": yt.title,
+            "author": yt.author,
+            "publish_date": publish_date,
+            "thumbnail_url": yt.thumbnail_url,
+            "length": yt.length,
+            "saved_at": time.time(),
+            "expires": min(expiries) if all(expiries) else 0,
+            "streams": records,
+            "options": [[label, stream.itag] for label, stream in options],
+            "audio": audio.itag if audio else None,
+        }
+
+        path = manifest_path(yt.video_id)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, path)
+
+        evict_manifests()
+    except Exception:
+        pass
+
+
+def load_manifest(video_id):
+    """
+    Returns (video, options, audio, fresh) from the cache, None if
+    there is no usable manifest. Stale manifests come back with
+    fresh=False, their urls are re-resolved when a download starts.
+    """
+    path = manifest_path(video_id)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+
+        if time.time() - manifest.get("saved_at", 0) > MAX_STALE_AGE:
+            return None
+
+        streams = {r["itag"]: CachedStream(r) for r in manifest["streams"]}
+        options = [(label, streams[itag]) for label, itag in manifest["options"]]
+        audio = streams.get(manifest.get("audio"))
+
+        os.utime(path)   # recently used, evicted last
+    except Exception:
+        return None
+
+    return CachedVideo(manifest), options, audio, is_fresh(manifest)
+
+
+def evict_manifests(max_entries=MAX_MANIFESTS):
+    """
+    Removes least recently used manifests above max_entries.
+    """
+    try:
+        entries = [
+            e for e in os.scandir(MANIFEST_DIR)
+            if e.name.endswith(".json")
+        ]
+    except OSError:
+        return
+
+    if len(entries) <= max_entries:
+        return
+
+    entries.sort(key=lambda e: e.stat().st_mtime)
+    for entry in entries[:len(entries) - max_entries]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
@@ -0,0 +1,67 @@
+import threading
+import time
+from utils.save_settings import get_bandwidth_limit
+
+
+# longest single sleep, so rate changes and cancels are picked up quickly
+MAX_WAIT_STEP = 0.25
+
+
+class TokenBucket:
+    """
+    Token bucket over bytes. rate is bytes per second, 0 means unlimited.
+    Any number of threads can draw from the same bucket.
+    """
+
+    def __init__(self, rate=0, burst_seconds=1.0):
+        self.lock = threading.Lock()
+        self.burst_seconds = burst_seconds
+        self.rate = 0
+        self.tokens = 0.0
+        self.last = time.monotonic()
+        self.set_rate(rate)
+
+    @property
+    def burst(self):
+        return self.rate * self.burst_seconds
+
+    def set_rate(self, rate):
+        with self.lock:
+            self.rate = max(0, int(rate or 0))
+            self.tokens = min(self.tokens, self.burst)
+            self.last = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+
+    def consume(self, amount, cancel_event=None):
+        """
+        Blocks until amount bytes may pass. A chunk larger than the
+        bucket goes through at once and the debt is paid back by
+        whoever draws next.
+        """
+        while True:
+            with self.lock:
+                if not self.rate:
+                    return
+
+                self.refill()
+                if self.tokens >= 0:
+                    self.tokens -= amount
+                    return
+
+                wait = -self.tokens / self.rate
+
+            if cancel_event and cancel_event.is_set():
+                return
+            time.sleep(min(wait, MAX_WAIT_STEP))
+
+
+# shared by every transfer in the process
+global_limiter = TokenBucket(get_bandwidth_limit())
+
+
+def set_global_limit(rate):
+    global_limiter.set_rate(rate)
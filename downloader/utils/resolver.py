@@ -0,0 +1,103 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pytubefix import YouTube
+from pytubefix.extract import video_id as extract_video_id
+from utils.stream_selection import quality_options, best_audio_stream
+from utils.manifest_cache import load_manifest, save_manifest
+
+
+# ----------------------------
+# Config
+# ----------------------------
+
+RESOLVER_WORKERS = 4
+
+
+class ResolvedVideo:
+    """
+    Result of a resolution: the video with its metadata already
+    fetched, the quality list built from its streams and the best
+    audio track. fresh is False for stale manifests from the cache.
+    """
+
+    def __init__(self, yt, options, audio, fresh=True):
+        self.yt = yt
+        self.options = options
+        self.audio = audio
+        self.fresh = fresh
+
+
+class Resolver:
+    """
+    Resolves YouTube metadata on a worker pool, off the Tk thread.
+    Concurrent requests for the same video_id share one fetch.
+    """
+
+    def __init__(self, max_workers=RESOLVER_WORKERS):
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="pica-resolver"
+        )
+        self.lock = threading.Lock()
+        self.inflight = {}   # video_id -> Future
+
+    def resolve(self, url):
+        """
+        Returns a Future of ResolvedVideo for url.
+        """
+        try:
+            key = extract_video_id(url)
+        except Exception:
+            key = url
+
+        with self.lock:
+            future = self.inflight.get(key)
+            if future is not None:
+                return future
+
+            future = self.executor.submit(self.fetch, url)
+            self.inflight[key] = future
+
+        future.add_done_callback(lambda _f: self.forget(key))
+        return future
+
+    @staticmethod
+    def cached(url):
+        """
+        Returns a ResolvedVideo from the on-disk manifest cache,
+        None on a miss. Reads local files only.
+        """
+        try:
+            manifest = load_manifest(extract_video_id(url))
+        except Exception:
+            return None
+
+        if not manifest:
+            return None
+        return ResolvedVideo(*manifest)
+
+    def forget(self, key):
+        with self.lock:
+            self.inflight.pop(key, None)
+
+    @staticmethod
+    def fetch(url):
+        yt = YouTube(url)
+
+        # touch everything the UI and library use, so no
+        # network call is left for the Tk thread
+        yt.title
+        yt.author
+        yt.publish_date
+        yt.thumbnail_url
+
+        options = quality_options(yt)
+        audio = best_audio_stream(yt)
+
+        # next open of this video is instant
+        save_manifest(yt, options, audio)
+
+        return ResolvedVideo(yt, options, audio)
+
+
+resolver = Resolver()
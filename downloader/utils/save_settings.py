@@ -38,3 +38,35 @@ def save_download_path(path: str):
             f.write(path)
     except Exception:
         pass
+
+
+# ----------------------------
+# Bandwidth limit
+# ----------------------------
+
+BANDWIDTH_SETTINGS_FILE = app_data_path("bandwidth_limit.txt")
+
+
+def get_bandwidth_limit():
+    """
+    Returns saved global download limit in bytes/s, 0 for unlimited.
+    """
+    try:
+        if os.path.exists(BANDWIDTH_SETTINGS_FILE):
+            with open(BANDWIDTH_SETTINGS_FILE, "r", encoding="utf-8") as f:
+                return max(0, int(f.read().strip() or 0))
+    except Exception:
+        pass
+
+    return 0
+
+
+def save_bandwidth_limit(limit: int):
+    """
+    Saves global download limit in bytes/s.
+    """
+    try:
+        with open(BANDWIDTH_SETTINGS_FILE, "w", encoding="utf-8") as f:
+            f.write(str(int(limit)))
+    except Exception:
+        pass
@@ -0,0 +1,452 @@
+import os
+import json
+import time
+import threading
+import requests
+from urllib.parse import urlparse, parse_qs
+from pytubefix import YouTube
+from utils.rate_limiter import global_limiter
+from utils.http_pool import get_session
+
+
+# ----------------------------
+# Config
+# ----------------------------
+
+CONNECTIONS = 4
+
+# googlevideo throttles single range requests above ~10 MB,
+# pytubefix uses 9 MB for the same reason. A multiple of
+# WRITE_BUFFER_SIZE, so ranges start on a block boundary.
+SEGMENT_SIZE = 8 * 1024 * 1024
+
+CHUNK_SIZE = 256 * 1024
+
+# chunks are collected and written to disk in blocks that end on
+# multiples of this size in the file, so writes land on 4 MB aligned
+# offsets even for ranges resumed mid block.
+# A range records its progress in the state record after every write.
+WRITE_BUFFER_SIZE = 4 * 1024 * 1024
+MAX_RETRIES = 3
+TIMEOUT = 15
+
+# refresh signed urls a little before they actually expire
+EXPIRY_MARGIN = 60
+
+
+class DownloadCancelled(Exception):
+    pass
+
+
+# ----------------------------
+# Helpers
+# ----------------------------
+
+def split_ranges(total_size, segment_size=SEGMENT_SIZE):
+    """
+    Splits 0..total_size into inclusive (start, end) byte ranges.
+    """
+    return [
+        (start, min(start + segment_size, total_size) - 1)
+        for start in range(0, total_size, segment_size)
+    ]
+
+
+def merge_intervals(intervals):
+    """
+    Merges overlapping / touching inclusive (start, end) intervals.
+    """
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def missing_ranges(total_size, done, segment_size=SEGMENT_SIZE):
+    """
+    Returns the byte ranges not covered by done, cut at multiples of
+    segment_size so resumed ranges stay block aligned.
+    """
+    ranges = []
+    pos = 0
+    for start, end in merge_intervals(done) + [(total_size, total_size)]:
+        while pos < start:
+            cut = min((pos // segment_size + 1) * segment_size, start)
+            ranges.append((pos, cut - 1))
+            pos = cut
+        pos = max(pos, end + 1)
+    return ranges
+
+
+def range_url(url, start, end):
+    return f"{url}&range={start}-{end}"
+
+
+def url_expiry(url):
+    """
+    Returns the unix time a signed stream url expires at, 0 if unknown.
+    """
+    try:
+        return int(parse_qs(urlparse(url).query)["expire"][0])
+    except Exception:
+        return 0
+
+
+def is_url_expired(url):
+    expires = url_expiry(url)
+    return bool(expires) and expires - EXPIRY_MARGIN <= time.time()
+
+
+def resolve_stream_url(watch_url, itag):
+    """
+    Re-resolves a fresh signed url for the same video and itag.
+    """
+    stream = YouTube(watch_url).streams.get_by_itag(itag)
+    if not stream:
+        raise IOError(f"Stream {itag} is no longer available")
+    return stream.url
+
+
+def preallocate(path, size):
+    """
+    Creates path with size bytes reserved on disk, so parallel ranges
+    and resumed downloads are written in place without fragmenting.
+    """
+    with open(path, "wb") as f:
+        if hasattr(os, "posix_fallocate"):
+            try:
+                os.posix_fallocate(f.fileno(), 0, size)
+                return
+            except OSError:
+                pass   # filesystem without fallocate support
+
+        f.truncate(size)
+
+
+def write_at(f, offset, data):
+    """
+    Positional write, safe for several handles on the same file.
+    """
+    view = memoryview(data)
+
+    if hasattr(os, "pwrite"):
+        while view:
+            written = os.pwrite(f.fileno(), view, offset)
+            view = view[written:]
+            offset += written
+    else:
+        f.seek(offset)
+        f.write(view)
+
+
+def replace_file(src, dst, attempts=10):
+    """
+    os.replace that retries while another handle (a streaming merge
+    reader, antivirus) briefly holds the file open on Windows.
+    """
+    for attempt in range(attempts):
+        try:
+            return os.replace(src, dst)
+        except PermissionError:
+            if attempt == attempts - 1:
+                raise
+            time.sleep(0.1)
+
+
+# ----------------------------
+# Resume state
+# ----------------------------
+
+def part_paths(output_path):
+    """
+    Returns (part file, state record) paths for an output file.
+    """
+    part_path = output_path + ".part"
+    return part_path, part_path + ".json"
+
+
+def load_resume_state(state_path, part_path, video_id, itag, total_size):
+    """
+    Returns the finished byte intervals from a previous attempt,
+    empty if there is nothing usable to resume.
+    """
+    if not os.path.exists(state_path) or not os.path.exists(part_path):
+        return []
+
+    try:
+        with open(state_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except Exception:
+        return []
+
+    if (
+        state.get("video_id") != video_id
+        or state.get("itag") != itag
+        or state.get("size") != total_size
+        or os.path.getsize(part_path) != total_size
+    ):
+        return []
+
+    return merge_intervals(tuple(r) for r in state.get("done", []))
+
+
+def save_resume_state(state_path, video_id, itag, total_size, done, url):
+    state = {
+        "video_id": video_id,
+        "itag": itag,
+        "size": total_size,
+        "done": merge_intervals(done),
+        "expires": url_expiry(url),
+    }
+
+    tmp_path = state_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, state_path)
+
+
+# ----------------------------
+# Unknown size
+# ----------------------------
+
+def download_unsized(stream, output_path, on_progress, cancel_event, limiters):
+    """
+    Sequential fallback for streams without a known size: one
+    segment after another until one comes back short. Draws from
+    the same limiters as ranged downloads. Not resumable.
+    """
+    session = get_session()
+    url = stream.url
+    approx = stream.filesize_approx or 0
+    part_path = output_path + ".part"
+    received = 0
+
+    with open(part_path, "wb") as f:
+        while True:
+            got = 0
+            with session.get(
+                range_url(url, received, received + SEGMENT_SIZE - 1),
+                stream=True,
+                timeout=TIMEOUT
+            ) as r:
+                if r.status_code == 416:
+                    break   # size was an exact multiple of SEGMENT_SIZE
+                r.raise_for_status()
+
+                for chunk in r.iter_content(CHUNK_SIZE):
+                    if cancel_event and cancel_event.is_set():
+                        raise DownloadCancelled()
+                    if not chunk:
+                        continue
+
+                    f.write(chunk)
+                    got += len(chunk)
+                    received += len(chunk)
+
+                    for bucket in limiters:
+                        bucket.consume(len(chunk), cancel_event)
+                    if on_progress:
+                        on_progress(stream, chunk, max(0, approx - received))
+
+            if got != SEGMENT_SIZE:
+                break   # last segment, or the whole file in one response
+
+    replace_file(part_path, output_path)
+    return output_path
+
+
+# ----------------------------
+# Segmented download
+# ----------------------------
+
+def download_stream(stream, output_path, on_progress=None,
+                    cancel_event=None, connections=CONNECTIONS,
+                    video_id=None, resolve_url=None, limiter=None,
+                    on_contiguous=None):
+    """
+    Downloads a pytubefix stream into output_path over parallel
+    HTTP range requests. Each range is written at its own offset.
+
+    Bytes go to output_path + ".part" next to a small state record,
+    so a later call with the same video_id/itag only fetches the
+    ranges that are still missing. resolve_url() is called for a
+    fresh signed url when the current one has expired.
+
+    Every chunk draws from the process-wide bandwidth limiter and,
+    if given, from a per-job limiter as well.
+
+    on_progress(stream, chunk, bytes_remaining) has the same
+    signature as pytubefix progress callbacks. on_contiguous(n) is
+    called whenever the first n bytes of the file are complete on disk.
+    """
+    total_size = stream.filesize
+    limiters = [global_limiter] + ([limiter] if limiter else [])
+
+    if not total_size:
+        return download_unsized(stream, output_path, on_progress, cancel_event, limiters)
+
+    itag = stream.itag
+    part_path, state_path = part_paths(output_path)
+
+    if (
+        not os.path.exists(part_path)
+        and os.path.exists(output_path)
+        and os.path.getsize(output_path) == total_size
+    ):
+        # finished in an earlier attempt
+        if on_progress:
+            on_progress(stream, b"", 0)
+        if on_contiguous:
+            on_contiguous(total_size)
+        return output_path
+
+    lock = threading.Lock()
+    errors = []
+
+    done = load_resume_state(state_path, part_path, video_id, itag, total_size)
+    if not done:
+        preallocate(part_path, total_size)
+
+    ranges = missing_ranges(total_size, done)
+    state = {
+        "downloaded": sum(end - start + 1 for start, end in done),
+        "url": stream.url,
+    }
+
+    def current_url(stale_url=None):
+        with lock:
+            url = state["url"]
+            needs_refresh = (url == stale_url) or is_url_expired(url)
+            if needs_refresh and resolve_url:
+                url = state["url"] = resolve_url()
+            return url
+
+    def report(chunk):
+        with lock:
+            state["downloaded"] += len(chunk)
+            remaining = total_size - state["downloaded"]
+            if on_progress:
+                on_progress(stream, chunk, remaining)
+
+    def contiguous():
+        if done and done[0][0] == 0:
+            return done[0][1] + 1
+        return 0
+
+    def mark_done(start, end):
+        with lock:
+            done[:] = merge_intervals(done + [(start, end)])
+            save_resume_state(
+                state_path, video_id, itag, total_size, done, state["url"]
+            )
+            if on_contiguous:
+                on_contiguous(contiguous())
+
+    def fetch_range(session, f, start, end):
+        offset = start          # next byte to request
+        buffer = bytearray()
+        buffer_start = start    # file offset of buffer[0]
+        tries = 0
+        url = current_url()
+
+        def write_buffer(full_blocks_only):
+            nonlocal buffer_start
+            while buffer:
+                # up to the next aligned offset in the file
+                size = WRITE_BUFFER_SIZE - buffer_start % WRITE_BUFFER_SIZE
+                if full_blocks_only and len(buffer) < size:
+                    break
+                block = buffer[:size]
+                write_at(f, buffer_start, block)
+                mark_done(buffer_start, buffer_start + len(block) - 1)
+                buffer_start += len(block)
+                del buffer[:len(block)]
+
+        try:
+            while offset <= end:
+                if cancel_event and cancel_event.is_set():
+                    raise DownloadCancelled()
+
+                try:
+                    with session.get(
+                        range_url(url, offset, end),
+                        stream=True,
+                        timeout=TIMEOUT
+                    ) as r:
+                        if r.status_code == 403:
+                            # signed url expired mid download
+                            url = current_url(stale_url=url)
+                        r.raise_for_status()
+
+                        for chunk in r.iter_content(CHUNK_SIZE):
+                            if cancel_event and cancel_event.is_set():
+                                raise DownloadCancelled()
+                            if not chunk:
+                                continue
+
+                            buffer += chunk
+                            offset += len(chunk)
+                            report(chunk)
+
+                            for bucket in limiters:
+                                bucket.consume(len(chunk), cancel_event)
+
+                            write_buffer(full_blocks_only=True)
+
+                except requests.RequestException:
+                    # resume this range from the last received byte
+                    tries += 1
+                    if tries > MAX_RETRIES:
+                        raise
+                    continue
+
+                if offset <= end:
+                    # connection closed early
+                    tries += 1
+                    if tries > MAX_RETRIES:
+                        raise IOError("Incomplete range response")
+        finally:
+            # received bytes are valid even if the range stopped early
+            write_buffer(full_blocks_only=False)
+
+    def worker():
+        session = get_session()
+        try:
+            with open(part_path, "r+b", buffering=0) as f:
+                while not errors:
+                    with lock:
+                        if not ranges:
+                            return
+                        start, end = ranges.pop(0)
+                    fetch_range(session, f, start, end)
+        except Exception as e:
+            errors.append(e)
+
+    if state["downloaded"] and on_progress:
+        # resumed bytes count as already downloaded
+        on_progress(stream, b"", total_size - state["downloaded"])
+    if on_contiguous and contiguous():
+        on_contiguous(contiguous())
+
+    threads = [
+        threading.Thread(target=worker, daemon=True)
+        for _ in range(max(1, min(connections, len(ranges))))
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    if errors:
+        raise errors[0]
+
+    replace_file(part_path, output_path)
+    try:
+        os.remove(state_path)
+    except Exception:
+        pass
+
+    return output_path
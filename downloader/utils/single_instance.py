@@ -0,0 +1,171 @@
+import json
+import os
+import secrets
+import socket
+import threading
+import time
+from utils.app_paths import app_data_path
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+
+# ----------------------------
+# Config
+# ----------------------------
+
+# held for the whole life of the running instance
+INSTANCE_LOCK_FILE = app_data_path("instance.lock")
+
+# port and token of the running instance's launch socket
+INSTANCE_INFO_FILE = app_data_path("instance.json")
+
+# a second launch gives up after this long
+FORWARD_TIMEOUT = 2.0
+
+
+class SingleInstance:
+    """
+    Keeps Pica to one process per user.
+
+    The first process takes the lock and listens on a localhost
+    socket. Later launches find the lock taken, send their command
+    line arguments to that socket and exit.
+    """
+
+    def __init__(self):
+        self.lock_file = None
+        self.server = None
+        self.token = None
+        self.on_args = None
+
+    # ----------------------------
+    # Lock
+    # ----------------------------
+
+    def acquire(self):
+        """
+        True if this process is now the running instance.
+        """
+        try:
+            f = open(INSTANCE_LOCK_FILE, "a+")
+        except OSError:
+            return True   # can't lock, better two instances than none
+
+        try:
+            if os.name == "nt":
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+
+        self.lock_file = f   # released by the OS when the process exits
+        return True
+
+    # ----------------------------
+    # Second launch
+    # ----------------------------
+
+    def forward(self, args):
+        """
+        Sends args to the running instance. False if it did not answer.
+        """
+        deadline = time.time() + FORWARD_TIMEOUT
+
+        while time.time() < deadline:
+            info = read_instance_info()
+            if info:
+                try:
+                    return send_args(info, args, deadline - time.time())
+                except OSError:
+                    pass
+
+            # the running instance may still be starting up
+            time.sleep(0.05)
+
+        return False
+
+    # ----------------------------
+    # Running instance
+    # ----------------------------
+
+    def listen(self, on_args):
+        """
+        Accepts forwarded launches, on_args(args) is called on a
+        background thread for each one.
+        """
+        self.on_args = on_args
+        self.token = secrets.token_hex(16)
+
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.bind(("127.0.0.1", 0))
+        self.server.listen(5)
+
+        info = {
+            "pid": os.getpid(),
+            "port": self.server.getsockname()[1],
+            "token": self.token,
+        }
+        tmp_path = INSTANCE_INFO_FILE + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(info, f)
+        os.replace(tmp_path, INSTANCE_INFO_FILE)
+
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def run(self):
+        while True:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                return   # socket closed
+
+            try:
+                self.handle(conn)
+            except Exception:
+                pass
+            finally:
+                conn.close()
+
+    def handle(self, conn):
+        conn.settimeout(FORWARD_TIMEOUT)
+        with conn.makefile("rb") as f:
+            message = json.loads(f.readline().decode("utf-8"))
+
+        if message.get("token") != self.token:
+            return
+
+        args = [a for a in message.get("args", []) if isinstance(a, str)]
+        conn.sendall(b"ok\n")
+
+        if self.on_args:
+            self.on_args(args)
+
+
+# ----------------------------
+# Helpers
+# ----------------------------
+
+def read_instance_info():
+    try:
+        with open(INSTANCE_INFO_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def send_args(info, args, timeout):
+    message = json.dumps({"token": info["token"], "args": args}) + "\n"
+
+    with socket.create_connection(
+        ("127.0.0.1", info["port"]),
+        timeout=max(0.1, timeout)
+    ) as conn:
+        conn.sendall(message.encode("utf-8"))
+        with conn.makefile("rb") as f:
+            return f.readline().strip() == b"ok"
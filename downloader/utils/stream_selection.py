@@ -0,0 +1,111 @@
+# ----------------------------
+# Stream selection
+# ----------------------------
+
+def best_audio_stream(yt):
+    """
+    Returns the highest bitrate audio stream, preferring mp4/m4a.
+    """
+    best_audio = (
+        yt.streams
+        .filter(only_audio=True, mime_type="audio/mp4")
+        .order_by("abr")
+        .desc()
+        .first()
+    )
+
+    # safe fallback
+    if not best_audio:
+        best_audio = (
+            yt.streams
+            .filter(only_audio=True)
+            .order_by("abr")
+            .desc()
+            .first()
+        )
+
+    return best_audio
+
+
+def quality_options(yt):
+    """
+    Returns [(label, stream), ...]: one mp4 stream per resolution
+    (progressive preferred), highest first, then the best audio.
+    """
+    video_streams = (
+        yt.streams
+        .filter(file_extension="mp4")
+        .order_by("resolution")
+        .desc()
+    )
+
+    streams_by_resolution = {}
+
+    for stream in video_streams:
+        res = stream.resolution
+        if not res:
+            continue
+
+        if res not in streams_by_resolution:
+            streams_by_resolution[res] = stream
+        else:
+            if stream.is_progressive and not streams_by_resolution[res].is_progressive:
+                streams_by_resolution[res] = stream
+
+    options = []
+
+    for res in sorted(
+        streams_by_resolution.keys(),
+        key=lambda x: int(x.replace("p", "")),
+        reverse=True
+    ):
+        stream = streams_by_resolution[res]
+        size_mb = stream.filesize_approx / (1024 * 1024)
+        options.append((f"{res}  •  {size_mb:.1f} MB", stream))
+
+    best_audio = best_audio_stream(yt)
+    if best_audio:
+        size_mb = best_audio.filesize_approx / (1024 * 1024)
+        options.append((f"Audio  •  {size_mb:.1f} MB", best_audio))
+
+    return options
+
+
+# ----------------------------
+# Quality presets
+# ----------------------------
+
+# "best", "audio", or a resolution cap such as "720p"
+QUALITY_PRESETS = ("best", "2160p", "1440p", "1080p", "720p", "480p", "360p", "audio")
+
+
+def pick_quality(options, preset):
+    """
+    Returns the (label, stream) of options matching preset.
+    Resolution presets take the highest resolution not above the cap,
+    the lowest one when every option is above it. None when nothing fits.
+    """
+    preset = (preset or "best").strip().lower()
+
+    videos = [o for o in options if o[1].type != "audio"]
+    audios = [o for o in options if o[1].type == "audio"]
+
+    if preset == "audio":
+        return audios[0] if audios else None
+
+    if not videos:
+        return audios[0] if audios else None
+
+    if preset == "best":
+        return videos[0]
+
+    try:
+        cap = int(preset.rstrip("p"))
+    except ValueError:
+        return videos[0]
+
+    # videos are ordered highest resolution first
+    for option in videos:
+        if int(option[1].resolution.rstrip("p")) <= cap:
+            return option
+    return videos[-1]
@@ -0,0 +1,201 @@
+import math
+import threading
+import time
+from collections import deque
+
+
+# ----------------------------
+# Config
+# ----------------------------
+
+# samples closer than this are folded into one ring buffer slot
+SAMPLE_INTERVAL = 0.1
+
+# ring buffer length, 60 s of history at SAMPLE_INTERVAL
+MAX_SAMPLES = 600
+
+# windowed throughput looks this far back
+RATE_WINDOW = 5.0
+
+# EWMA time constant
+EWMA_TAU = 3.0
+
+# no bytes for this long counts as a stall
+STALL_SECONDS = 8.0
+
+
+class TransferTelemetry:
+    """
+    Throughput statistics of one transfer.
+
+    add(n) is called from any download thread. Readers (UI, queue,
+    logs) get windowed and EWMA rates, an ETA, stall state and
+    per-phase totals. Rates are computed at read time, so they fall
+    off while no bytes arrive.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.samples = deque(maxlen=MAX_SAMPLES)   # (timestamp, total bytes)
+            self.total = 0
+            self.ewma = 0.0
+            self.started = None
+            self.last_data = None
+            self.phases = {}
+            self.phase = None
+
+    # ----------------------------
+    # Write side
+    # ----------------------------
+
+    def start_phase(self, name):
+        now = time.time()
+        with self.lock:
+            self.close_phase(now)
+            self.phase = name
+            self.phases[name] = {
+                "bytes": 0,
+                "started": now,
+                "ended": None,
+                "peak_rate": 0.0,
+            }
+
+            # a new phase measures its own pace from here
+            self.samples.clear()
+            self.samples.append((now, self.total))
+            self.ewma = 0.0
+            self.started = now
+            self.last_data = now
+
+    def end_phase(self):
+        with self.lock:
+            self.close_phase(time.time())
+            self.phase = None
+
+    def close_phase(self, now):
+        stats = self.phases.get(self.phase)
+        if stats and stats["ended"] is None:
+            stats["ended"] = now
+
+    def add(self, nbytes):
+        if nbytes <= 0:
+            return
+
+        now = time.time()
+        with self.lock:
+            if self.started is None:
+                self.started = now
+                self.samples.append((now, self.total))
+
+            dt = now - (self.last_data or now)
+            self.total += nbytes
+            self.last_data = now
+
+            if self.samples and now - self.samples[-1][0] < SAMPLE_INTERVAL:
+                self.samples[-1] = (self.samples[-1][0], self.total)
+            else:
+                self.samples.append((now, self.total))
+
+            if dt > 0:
+                alpha = 1 - math.exp(-dt / EWMA_TAU)
+                self.ewma += alpha * (nbytes / dt - self.ewma)
+
+            stats = self.phases.get(self.phase)
+            if stats:
+                stats["bytes"] += nbytes
+                stats["peak_rate"] = max(stats["peak_rate"], self.window_rate(now))
+
+    # ----------------------------
+    # Read side
+    # ----------------------------
+
+    def window_rate(self, now=None):
+        """
+        Bytes/s over the last RATE_WINDOW seconds (caller holds lock
+        or accepts a racy read).
+        """
+        now = now or time.time()
+        if not self.samples:
+            return 0.0
+
+        start = now - RATE_WINDOW
+        base_time, base_bytes = self.samples[0]
+        for ts, total in self.samples:
+            if ts > start:
+                break
+            base_time, base_bytes = ts, total
+
+        span = now - base_time
+        if span <= 0:
+            return 0.0
+        return (self.total - base_bytes) / span
+
+    def rate(self):
+        with self.lock:
+            return self.window_rate()
+
+    def ewma_rate(self):
+        with self.lock:
+            if self.last_data is None:
+                return 0.0
+            idle = time.time() - self.last_data
+            return self.ewma * math.exp(-idle / EWMA_TAU)
+
+    def eta(self, remaining_bytes):
+        """
+        Seconds left for remaining_bytes at the windowed rate,
+        None while the rate is unknown or the transfer is stalled.
+        """
+        if self.stalled():
+            return None
+        rate = self.rate()
+        if rate <= 0:
+            return None
+        return max(0.0, remaining_bytes / rate)
+
+    def stalled(self):
+        with self.lock:
+            if self.last_data is None:
+                return False
+            return time.time() - self.last_data >= STALL_SECONDS
+
+    def idle_seconds(self):
+        with self.lock:
+            if self.last_data is None:
+                return 0.0
+            return time.time() - self.last_data
+
+    def phase_stats(self):
+        """
+        Returns {phase: {bytes, duration, avg_rate, peak_rate}}.
+        """
+        now = time.time()
+        with self.lock:
+            result = {}
+            for name, stats in self.phases.items():
+                duration = (stats["ended"] or now) - stats["started"]
+                result[name] = {
+                    "bytes": stats["bytes"],
+                    "duration": duration,
+                    "avg_rate": stats["bytes"] / duration if duration > 0 else 0.0,
+                    "peak_rate": stats["peak_rate"],
+                }
+            return result
+
+    def snapshot(self):
+        """
+        Plain dict of the current numbers, for schedulers and logs.
+        """
+        return {
+            "bytes": self.total,
+            "rate": self.rate(),
+            "ewma_rate": self.ewma_rate(),
+            "stalled": self.stalled(),
+            "idle_seconds": self.idle_seconds(),
+            "phase": self.phase,
+            "phases": self.phase_stats(),
+        }
@@ -0,0 +1,191 @@
+import heapq
+import io
+import itertools
+import threading
+from collections import OrderedDict
+from PIL import Image, ImageTk
+from utils.thumbnail_pack import thumbnail_pack
+from utils.ui_bus import ui_bus
+
+
+# ----------------------------
+# Config
+# ----------------------------
+
+THUMB_WORKERS = 3
+
+# decoded thumbnails kept in memory, shared by every library window
+THUMB_MEMORY_BUDGET = 96 * 1024 * 1024
+
+PLACEHOLDER_COLOR = "#222"
+
+# priorities, lower loads first
+VISIBLE = 0
+NEARBY = 1
+
+
+class ThumbnailRequest:
+    """
+    Handle of one queued thumbnail. cancel() drops it if it has not
+    been decoded yet, and always stops on_done from being called.
+    """
+
+    __slots__ = ("video_id", "size", "on_done", "cancelled")
+
+    def __init__(self, video_id, size, on_done):
+        self.video_id = video_id
+        self.size = size
+        self.on_done = on_done
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+def decode_thumbnail(video_id, size):
+    """
+    Returns the packed thumbnail of video_id as an RGB image no larger
+    than size, None if there is none.
+    """
+    data = thumbnail_pack.get(video_id)
+    if not data:
+        return None
+
+    with Image.open(io.BytesIO(data)) as im:
+        # JPEGs decode straight at 1/2, 1/4 or 1/8 scale, no larger
+        # than needed, instead of at full resolution
+        im.draft("RGB", size)
+        im.thumbnail(size, Image.BILINEAR)
+        return im.convert("RGB")
+
+
+# ----------------------------
+# Memory cache (Tk thread only)
+# ----------------------------
+
+class ThumbnailCache:
+    """
+    LRU of PhotoImages bounded by their pixel memory. Cards showing
+    an evicted image keep it alive until they move on.
+    """
+
+    def __init__(self, budget=THUMB_MEMORY_BUDGET):
+        self.budget = budget
+        self.used = 0
+        self.images = OrderedDict()   # key -> (photo, nbytes)
+
+    def get(self, key):
+        item = self.images.get(key)
+        if item is None:
+            return None
+        self.images.move_to_end(key)
+        return item[0]
+
+    def put(self, key, photo):
+        nbytes = photo.width() * photo.height() * 4
+        if key in self.images:
+            self.used -= self.images.pop(key)[1]
+
+        self.images[key] = (photo, nbytes)
+        self.used += nbytes
+
+        while self.used > self.budget and len(self.images) > 1:
+            _, (_, freed) = self.images.popitem(last=False)
+            self.used -= freed
+
+    def clear(self):
+        self.images.clear()
+        self.used = 0
+
+
+thumbnail_cache = ThumbnailCache()
+
+_placeholders = {}
+
+
+def get_placeholder(size):
+    """
+    One shared placeholder PhotoImage per size.
+    """
+    photo = _placeholders.get(size)
+    if photo is None:
+        photo = ImageTk.PhotoImage(Image.new("RGB", size, PLACEHOLDER_COLOR))
+        _placeholders[size] = photo
+    return photo
+
+
+# ----------------------------
+# Worker pool
+# ----------------------------
+
+class ThumbnailLoader:
+    """
+    Decodes and resizes thumbnails on worker threads.
+
+    request() is called on the Tk thread. Thumbnails in the memory
+    cache are handed to on_done(photo) right away; the rest are
+    queued by priority (then request order) and on_done(photo) is
+    called on the Tk thread through the UI bus, with None if there is
+    no thumbnail or it could not be read. Only PhotoImage creation is
+    left for the Tk thread.
+    """
+
+    def __init__(self, workers=THUMB_WORKERS):
+        self.workers = workers
+        self.cond = threading.Condition()
+        self.queue = []          # heap of (priority, seq, request)
+        self.seq = itertools.count()
+        self.threads = []
+
+    def request(self, video_id, size, on_done, priority=VISIBLE):
+        photo = thumbnail_cache.get((video_id, size))
+        if photo is not None:
+            on_done(photo)
+            return None
+
+        request = ThumbnailRequest(video_id, size, on_done)
+
+        with self.cond:
+            heapq.heappush(self.queue, (priority, next(self.seq), request))
+            self.start_workers()
+            self.cond.notify()
+
+        return request
+
+    def start_workers(self):
+        # caller holds cond, workers start on first use and then idle
+        while len(self.threads) < self.workers:
+            thread = threading.Thread(target=self.run, daemon=True)
+            self.threads.append(thread)
+            thread.start()
+
+    def run(self):
+        while True:
+            with self.cond:
+                while not self.queue:
+                    self.cond.wait()
+                _, _, request = heapq.heappop(self.queue)
+
+            if request.cancelled:
+                continue   # scrolled away before its turn
+
+            try:
+                img = decode_thumbnail(request.video_id, request.size)
+            except Exception:
+                img = None
+
+            ui_bus.post(("thumb", request), self.deliver, request, img)
+
+    @staticmethod
+    def deliver(request, img):
+        photo = None
+        if img is not None:
+            # cached even if the card moved on, it may scroll back
+            photo = ImageTk.PhotoImage(img)
+            thumbnail_cache.put((request.video_id, request.size), photo)
+
+        if not request.cancelled:
+            request.on_done(photo)
+
+
+thumbnail_loader = ThumbnailLoader()
@@ -0,0 +1,566 @@
+import mmap
+import os
+import struct
+import threading
+import zlib
+from contextlib import contextmanager
+from utils.app_paths import app_data_dir
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+
+# ----------------------------
+# Config
+# ----------------------------
+
+PACK_DIR = app_data_dir()
+PACK_NAME = "thumbs"
+
+# one jpg per video and resized copies, inside PACK_DIR, imported
+# into the pack once
+LEGACY_THUMBS_DIR = "thumbs"
+LEGACY_RESIZED_DIR = os.path.join("cache", "thumbs")
+
+# index slots of a new pack, always a power of two
+INITIAL_CAPACITY = 1024
+
+# share of used slots (live + deleted) before the index is rebuilt
+MAX_LOAD = 0.7
+
+# removed bytes before the data file is rewritten without them
+COMPACT_MIN_DEAD = 8 * 1024 * 1024
+COMPACT_DEAD_RATIO = 0.5
+
+
+# ----------------------------
+# File format
+# ----------------------------
+#
+# thumbs.<generation>.pack   magic, then records appended one after
+#                            another: key, length, jpeg bytes. An
+#                            empty record marks a removal.
+# thumbs.<generation>.idx    header, then an open addressing hash
+#                            table of key -> offset, length
+#
+# Compaction and growth write the next generation and mark the old
+# index stale, so other processes holding it open move on too.
+
+PACK_MAGIC = b"PTPK\x01\x00\x00\x00"
+INDEX_MAGIC = b"PTIX"
+INDEX_VERSION = 1
+
+KEY_SIZE = 16
+HEADER = struct.Struct("<4sIIIIIQ")   # magic, version, capacity, count, used, stale, dead
+SLOT = struct.Struct("<16sQII")       # key, offset, length, state
+RECORD = struct.Struct("<16sI")       # key, length
+U32 = struct.Struct("<I")
+U64 = struct.Struct("<Q")
+
+# header field offsets
+COUNT_AT = 12    # live keys
+USED_AT = 16     # slots not empty
+STALE_AT = 20    # a newer generation exists
+DEAD_AT = 24     # data bytes no longer indexed
+
+# slot states, written last so readers never see half a slot as live
+EMPTY = 0
+LIVE = 1
+DELETED = 2
+STATE_AT = KEY_SIZE + 8 + 4
+
+
+def encode_key(video_id):
+    key = (video_id or "").encode("utf-8")
+    if not key or len(key) > KEY_SIZE:
+        return None
+    return key.ljust(KEY_SIZE, b"\0")
+
+
+def probe(index, capacity, key):
+    """
+    Returns (position, live) of key's slot, or of the slot where it
+    would go if it is not in the table.
+    """
+    mask = capacity - 1
+    i = zlib.crc32(key) & mask
+    free = None
+
+    for _ in range(capacity):
+        pos = HEADER.size + i * SLOT.size
+        slot_key, _, _, state = SLOT.unpack_from(index, pos)
+
+        if state == EMPTY:
+            return (pos if free is None else free), False
+        if state == LIVE and slot_key == key:
+            return pos, True
+        if state == DELETED and free is None:
+            free = pos
+
+        i = (i + 1) & mask
+
+    return free, False
+
+
+def free_slot(index, capacity, key):
+    """
+    Returns the first empty or deleted slot on key's probe path.
+    """
+    mask = capacity - 1
+    i = zlib.crc32(key) & mask
+
+    for _ in range(capacity):
+        pos = HEADER.size + i * SLOT.size
+        if U32.unpack_from(index, pos + STATE_AT)[0] != LIVE:
+            return pos
+        i = (i + 1) & mask
+
+    return None
+
+
+def capacity_for(count):
+    capacity = INITIAL_CAPACITY
+    while count > capacity * MAX_LOAD / 2:
+        capacity *= 2
+    return capacity
+
+
+def remove_files(folder, names):
+    """
+    Removes names from folder, then the folder itself if it is empty.
+    """
+    for name in names:
+        try:
+            os.remove(os.path.join(folder, name))
+        except OSError:
+            pass
+    try:
+        os.rmdir(folder)
+    except OSError:
+        pass   # something else is still in there
+
+
+class ThumbnailPack:
+    """
+    Every thumbnail in one append-only data file, found through a
+    memory-mapped hash index keyed by video id. A lookup is a hash
+    probe and a slice of the data map, with no stat or open per file.
+
+    Safe to use from several threads and processes. Writers take a
+    lock file; readers only take the in-process lock.
+    """
+
+    def __init__(self, folder=PACK_DIR):
+        self.folder = folder
+        self.lock = threading.RLock()
+        self.lock_file = None
+        self.lock_depth = 0
+
+        self.generation = None
+        self.capacity = 0
+        self.index = None   # mmap of the index, written in place
+        self.data = None    # read-only mmap of the data, remapped as it grows
+
+    # ----------------------------
+    # Public API
+    # ----------------------------
+
+    def get(self, video_id):
+        """
+        Returns the thumbnail bytes of video_id, None if not packed.
+        """
+        key = encode_key(video_id)
+        if key is None:
+            return None
+
+        with self.lock:
+            try:
+                self.ensure_open()
+                pos, live = probe(self.index, self.capacity, key)
+                if not live:
+                    return None
+                _, offset, length, _ = SLOT.unpack_from(self.index, pos)
+                return self.read(offset, length)
+            except Exception:
+                return None
+
+    def has(self, video_id):
+        key = encode_key(video_id)
+        if key is None:
+            return False
+
+        with self.lock:
+            try:
+                self.ensure_open()
+                return probe(self.index, self.capacity, key)[1]
+            except Exception:
+                return False
+
+    def put(self, video_id, data):
+        """
+        Appends data as video_id's thumbnail, replacing any older one.
+        """
+        key = encode_key(video_id)
+        if key is None or not data:
+            return False
+
+        with self.lock, self.file_lock():
+            self.ensure_open()
+
+            used = U32.unpack_from(self.index, USED_AT)[0]
+            if used + 1 > self.capacity * MAX_LOAD:
+                self.rebuild()
+
+            offset = self.append(key, data)
+            self.set_slot(key, offset, len(data))
+
+        return True
+
+    def remove_many(self, video_ids):
+        """
+        Drops every id from the index, compacting the data file once
+        enough of it is unused. Returns how many were removed.
+        """
+        keys = [k for k in map(encode_key, set(video_ids)) if k]
+        if not keys:
+            return 0
+
+        with self.lock, self.file_lock():
+            self.ensure_open()
+
+            slots = []
+            for key in keys:
+                pos, live = probe(self.index, self.capacity, key)
+                if live:
+                    slots.append((key, pos))
+            if not slots:
+                return 0
+
+            # logged in the data file too, so a recovered index
+            # does not bring them back
+            with open(self.path(self.generation, "pack"), "ab") as f:
+                f.write(b"".join(RECORD.pack(key, 0) for key, _ in slots))
+
+            for _, pos in slots:
+                _, _, length, _ = SLOT.unpack_from(self.index, pos)
+                U32.pack_into(self.index, pos + STATE_AT, DELETED)
+                self.add_to_header(COUNT_AT, -1)
+                self.add_to_header(DEAD_AT, 2 * RECORD.size + length, U64)
+
+            dead = U64.unpack_from(self.index, DEAD_AT)[0]
+            if dead >= COMPACT_MIN_DEAD and dead >= self.data_size() * COMPACT_DEAD_RATIO:
+                self.rebuild()
+
+        return len(slots)
+
+    def compact(self):
+        """
+        Rewrites the pack with live thumbnails only.
+        """
+        with self.lock, self.file_lock():
+            self.ensure_open()
+            self.rebuild()
+
+    # ----------------------------
+    # Opening
+    # ----------------------------
+
+    def path(self, generation, ext):
+        return os.path.join(self.folder, f"{PACK_NAME}.{generation}.{ext}")
+
+    def generations(self):
+        found = []
+        for name in os.listdir(self.folder):
+            parts = name.split(".")
+            if len(parts) == 3 and parts[0] == PACK_NAME and parts[1].isdigit():
+                found.append((int(parts[1]), parts[2]))
+        return found
+
+    def latest_generation(self):
+        return max((g for g, ext in self.generations() if ext == "idx"), default=None)
+
+    def ensure_open(self):
+        # caller holds self.lock
+        if self.index is not None:
+            if not U32.unpack_from(self.index, STALE_AT)[0]:
+                return
+            self.close()   # another process compacted
+
+        generation = self.latest_generation()
+        if generation is None:
+            with self.file_lock():
+                generation = self.latest_generation()
+                if generation is None:
+                    generation = self.create()
+
+        try:
+            self.map(generation)
+        except (OSError, ValueError, struct.error):
+            self.close()
+            with self.file_lock():
+                # another process may have recovered it already
+                latest = self.latest_generation()
+                if latest == generation:
+                    latest = self.recover(generation)
+                generation = latest
+                self.map(generation)
+
+        self.remove_older(generation)
+
+    def map(self, generation):
+        with open(self.path(generation, "idx"), "r+b") as f:
+            index = mmap.mmap(f.fileno(), 0)
+
+        magic, version, capacity = HEADER.unpack_from(index, 0)[:3]
+        if (
+            magic != INDEX_MAGIC
+            or version != INDEX_VERSION
+            or capacity & (capacity - 1)
+            or len(index) != HEADER.size + capacity * SLOT.size
+        ):
+            index.close()
+            raise ValueError("bad thumbnail index")
+
+        self.index = index
+        self.capacity = capacity
+        self.generation = generation
+        self.map_data()
+
+        if self.data[:len(PACK_MAGIC)] != PACK_MAGIC:
+            raise ValueError("bad thumbnail pack")
+
+    def map_data(self):
+        if self.data is not None:
+            self.data.close()
+        with open(self.path(self.generation, "pack"), "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self):
+        for m in (self.index, self.data):
+            if m is not None:
+                try:
+                    m.close()
+                except Exception:
+                    pass
+        self.index = None
+        self.data = None
+
+    def remove_older(self, generation):
+        # fails on Windows while another process still maps them,
+        # retried on the next open
+        for g, ext in self.generations():
+            if g < generation:
+                try:
+                    os.remove(self.path(g, ext))
+                except OSError:
+                    pass
+
+    # ----------------------------
+    # Reading
+    # ----------------------------
+
+    def read(self, offset, length):
+        end = offset + length
+        if end > len(self.data):
+            self.map_data()   # appended since it was mapped
+            if end > len(self.data):
+                return None
+        return self.data[offset:end]
+
+    def data_size(self):
+        return os.path.getsize(self.path(self.generation, "pack"))
+
+    # ----------------------------
+    # Writing (caller holds self.lock and the file lock)
+    # ----------------------------
+
+    @contextmanager
+    def file_lock(self):
+        # caller holds self.lock, reentrant
+        if self.lock_depth == 0:
+            if self.lock_file is None:
+                self.lock_file = open(os.path.join(self.folder, f"{PACK_NAME}.lock"), "a+b")
+            if os.name == "nt":
+                self.lock_file.seek(0)
+                msvcrt.locking(self.lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            else:
+                fcntl.flock(self.lock_file.fileno(), fcntl.LOCK_EX)
+
+        self.lock_depth += 1
+        try:
+            yield
+        finally:
+            self.lock_depth -= 1
+            if self.lock_depth == 0:
+                if os.name == "nt":
+                    self.lock_file.seek(0)
+                    msvcrt.locking(self.lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+                else:
+                    fcntl.flock(self.lock_file.fileno(), fcntl.LOCK_UN)
+
+    def append(self, key, data):
+        with open(self.path(self.generation, "pack"), "ab") as f:
+            f.seek(0, os.SEEK_END)
+            offset = f.tell() + RECORD.size
+            f.write(RECORD.pack(key, len(data)))
+            f.write(data)
+        return offset
+
+    def set_slot(self, key, offset, length):
+        old, live = probe(self.index, self.capacity, key)
+
+        # a live slot is never rewritten: the new one goes live in a
+        # free slot first, then the old one is deleted. A reader in
+        # between finds either record, both complete.
+        pos = free_slot(self.index, self.capacity, key) if live else old
+
+        state = SLOT.unpack_from(self.index, pos)[3]
+        SLOT.pack_into(self.index, pos, key, offset, length, state)
+        U32.pack_into(self.index, pos + STATE_AT, LIVE)
+
+        if state == EMPTY:
+            self.add_to_header(USED_AT, 1)
+
+        if live:
+            _, _, old_length, _ = SLOT.unpack_from(self.index, old)
+            U32.pack_into(self.index, old + STATE_AT, DELETED)
+            self.add_to_header(DEAD_AT, RECORD.size + old_length, U64)
+        else:
+            self.add_to_header(COUNT_AT, 1)
+
+    def add_to_header(self, at, delta, field=U32):
+        field.pack_into(self.index, at, field.unpack_from(self.index, at)[0] + delta)
+
+    def live_records(self):
+        for i in range(self.capacity):
+            key, offset, length, state = SLOT.unpack_from(self.index, HEADER.size + i * SLOT.size)
+            if state == LIVE:
+                data = self.read(offset, length)
+                if data is not None:
+                    yield key, data
+
+    def rebuild(self):
+        """
+        Writes the next generation from the live thumbnails, with an
+        index sized for them, and switches to it.
+        """
+        count = U32.unpack_from(self.index, COUNT_AT)[0]
+        generation = self.write_generation(
+            self.generation + 1,
+            self.live_records(),
+            count
+        )
+
+        U32.pack_into(self.index, STALE_AT, 1)
+        self.close()
+        self.map(generation)
+        self.remove_older(generation)
+
+    def write_generation(self, generation, records, count):
+        """
+        Writes a data file and its index from (key, data) pairs. The
+        index is renamed into place last, so a generation only exists
+        once it is complete.
+        """
+        capacity = capacity_for(count)
+        index = bytearray(HEADER.size + capacity * SLOT.size)
+        live = 0
+
+        with open(self.path(generation, "pack"), "wb") as f:
+            f.write(PACK_MAGIC)
+            for key, data in records:
+                pos, found = probe(index, capacity, key)
+                if found:
+                    continue   # first one wins
+                offset = f.tell() + RECORD.size
+                f.write(RECORD.pack(key, len(data)))
+                f.write(data)
+                SLOT.pack_into(index, pos, key, offset, len(data), LIVE)
+                live += 1
+
+                if live > capacity * MAX_LOAD:
+                    raise ValueError("thumbnail count changed while packing")
+
+        HEADER.pack_into(index, 0, INDEX_MAGIC, INDEX_VERSION, capacity, live, live, 0, 0)
+
+        tmp = self.path(generation, "idx.tmp")
+        with open(tmp, "wb") as f:
+            f.write(index)
+        os.replace(tmp, self.path(generation, "idx"))
+
+        return generation
+
+    # ----------------------------
+    # Creation and recovery
+    # ----------------------------
+
+    def create(self):
+        """
+        First pack, with the thumbnails of the old one-file-per-video
+        store. Only the files that made it into the pack are removed,
+        and the old folders only if nothing else is left in them.
+        """
+        legacy = os.path.join(self.folder, LEGACY_THUMBS_DIR)
+        names = []
+        if os.path.isdir(legacy):
+            names = [
+                n for n in os.listdir(legacy)
+                if n.endswith(".jpg") and encode_key(n[:-4])
+            ]
+
+        imported = []
+
+        def records():
+            for name in names:
+                try:
+                    with open(os.path.join(legacy, name), "rb") as f:
+                        data = f.read()
+                except OSError:
+                    continue
+                if data:
+                    imported.append(name)
+                    yield encode_key(name[:-4]), data
+
+        generation = self.write_generation(1, records(), len(names))
+
+        remove_files(legacy, imported)
+
+        # the resized copies are only a cache of the old files
+        resized = os.path.join(self.folder, LEGACY_RESIZED_DIR)
+        if os.path.isdir(resized):
+            remove_files(resized, [n for n in os.listdir(resized) if n.endswith(".jpg")])
+        return generation
+
+    def recover(self, generation):
+        """
+        Rebuilds an unreadable index from its data file, newest record
+        of each key wins and removals stay removed. Returns the
+        generation to map.
+        """
+        found = {}
+        try:
+            with open(self.path(generation, "pack"), "rb") as f:
+                if f.read(len(PACK_MAGIC)) != PACK_MAGIC:
+                    raise ValueError("bad thumbnail pack")
+                while True:
+                    head = f.read(RECORD.size)
+                    if len(head) < RECORD.size:
+                        break
+                    key, length = RECORD.unpack(head)
+                    data = f.read(length)
+                    if len(data) < length:
+                        break   # cut short by a crash
+                    if length:
+                        found[key] = data
+                    else:
+                        found.pop(key, None)
+        except (OSError, ValueError):
+            pass
+
+        # kept in memory, recovery is rare and a pack is small
+        return self.write_generation(generation + 1, found.items(), len(found))
+
+
+thumbnail_pack = ThumbnailPack()
@@ -0,0 +1,99 @@
+import threading
+import time
+
+
+# ----------------------------
+# Config
+# ----------------------------
+
+# upper bound of UI refreshes per second
+UI_FPS = 20
+
+
+class UIBus:
+    """
+    Hands updates from worker threads to the Tk thread.
+
+    post(key, callback, *args) can be called from any thread. Posts
+    with the same key are merged, only the latest runs, so a burst of
+    progress events costs one widget refresh per frame. The Tk thread
+    drains the bus at most UI_FPS times a second and only while
+    something is pending, an idle bus schedules nothing.
+    """
+
+    def __init__(self, fps=UI_FPS):
+        self.interval = max(1, int(1000 / fps))
+        self.lock = threading.Lock()
+        self.pending = {}        # key -> (callback, args), insertion ordered
+        self.scheduled = False
+        self.last_drain = 0.0
+        self.root = None
+
+    def attach(self, root):
+        """
+        Binds the bus to the Tk root, call once from the Tk thread.
+        """
+        self.root = root
+        with self.lock:
+            delay = self.claim_drain()
+        self.schedule(delay)
+
+    def post(self, key, callback, *args):
+        with self.lock:
+            self.pending.pop(key, None)   # re-queue at the end
+            self.pending[key] = (callback, args)
+            delay = self.claim_drain()
+        self.schedule(delay)
+
+    def discard(self, key):
+        with self.lock:
+            self.pending.pop(key, None)
+
+    # ----------------------------
+    # Tk side
+    # ----------------------------
+
+    def claim_drain(self):
+        """
+        Returns the delay of a drain the caller has to schedule, None
+        if one is already scheduled. Caller holds the lock.
+        """
+        if self.root is None or self.scheduled or not self.pending:
+            return None
+        self.scheduled = True
+        wait = self.interval - (time.time() - self.last_drain) * 1000
+        return max(0, int(wait))
+
+    def schedule(self, delay):
+        # never called with the lock held: with threaded Tcl, after()
+        # from a worker waits for the Tk thread, which may itself be
+        # waiting for the lock at the end of drain()
+        if delay is None:
+            return
+        try:
+            self.root.after(delay, self.drain)
+        except Exception:
+            # root is gone, or not ready yet, next post retries
+            with self.lock:
+                self.scheduled = False
+
+    def drain(self):
+        with self.lock:
+            batch = list(self.pending.values())
+            self.pending.clear()
+            self.scheduled = False
+            self.last_drain = time.time()
+
+        for callback, args in batch:
+            try:
+                callback(*args)
+            except Exception:
+                pass   # one dead window must not stall the others
+
+        with self.lock:
+            # posted while draining, picked up next frame
+            delay = self.claim_drain()
+        self.schedule(delay)
+
+
+ui_bus = UIBus()
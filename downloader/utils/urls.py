@@ -0,0 +1,41 @@
+from pytubefix.extract import video_id as extract_video_id
+
+
+# ----------------------------
+# YouTube URL helpers
+# ----------------------------
+
+def normalize_youtube_url(url):
+    """
+    Turns shorts and youtu.be links into watch urls.
+    """
+    try:
+        if "/shorts/" in url:
+            video_id = url.split("/shorts/")[1].split("?")[0]
+            return f"https://www.youtube.com/watch?v={video_id}"
+
+        if "youtu.be/" in url:
+            video_id = url.split("youtu.be/")[1].split("?")[0]
+            return f"https://www.youtube.com/watch?v={video_id}"
+
+        return url
+    except Exception:
+        return url
+
+
+def video_id_from_url(url):
+    """
+    Returns the video id in url without any network call,
+    None if url is not a single video.
+    """
+    try:
+        return extract_video_id(url)
+    except Exception:
+        return None
+
+
+def is_youtube_url(url):
+    return (
+        url.startswith("https://www.youtube.com/")
+        or url.startswith("https://youtu.be/")
+    )
@@ -0,0 +1,24 @@
+// ------------------------------
+// Hands videos to the Pica desktop app over its localhost endpoint.
+// Runs in the extension origin, so the app can tell it apart from
+// web pages. Replies { ok: false } when Pica can't be reached and
+// the content script falls back to the clipboard.
+// ------------------------------
+const PICA_ENDPOINT = "http://127.0.0.1:47653/download";
+
+chrome.runtime.onMessage.addListener((message, sender, sendResponse) => {
+  if (!message || message.type !== "pica-download") return;
+
+  fetch(PICA_ENDPOINT, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({
+      url: message.url,
+      quality: message.quality || null
+    })
+  })
+    .then((response) => sendResponse({ ok: response.ok }))
+    .catch(() => sendResponse({ ok: false }));
+
+  return true; // response is sent asynchronously
+});
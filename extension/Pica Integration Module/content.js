@@ -11,6 +11,32 @@
     let overlayDismissed = false;
     let lastUrl = location.href;
 
+    // ------------------------------
+    // Handoff: local endpoint first, clipboard as fallback
+    // ------------------------------
+    function copyToClipboard(url) {
+      try {
+        navigator.clipboard.writeText(url + " " + TRIGGER);
+      } catch (err) {
+        // fail silently
+      }
+    }
+
+    function sendToPica(url) {
+      try {
+        chrome.runtime.sendMessage(
+          { type: "pica-download", url: url },
+          (response) => {
+            if (chrome.runtime.lastError || !response || !response.ok) {
+              copyToClipboard(url);
+            }
+          }
+        );
+      } catch (err) {
+        copyToClipboard(url);
+      }
+    }
+
     // ------------------------------
     // Add overlay button
     // ------------------------------
@@ -54,14 +80,10 @@
         e.stopPropagation();
         e.preventDefault();
 
-        try {
-          // Copy raw URL, desktop app handles normalization
-          navigator.clipboard.writeText(
-            window.location.href + " " + TRIGGER
-          );
-        } catch (err) {
-          // fail silently
-        }
+        // Raw URL, desktop app handles normalization
+        const url = window.location.href;
+
+        sendToPica(url);
 
         overlayDismissed = true;
         container.remove();